@@ -0,0 +1,99 @@
+# Скрипт замера стоимости сериализации списка бронирований.
+# Сравнивает путь FastAPI по response_model (проверка схемы и кодирование)
+# с быстрым путем для доверенных объектов ORM (FAST_JSON=1).
+# Объекты создаются в памяти, БД не используется.
+#
+# Запуск: python -m backend.benchmark_serialization [количество строк ...]
+
+import json
+import sys
+import timeit
+from datetime import date, time, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from backend import models, schemas
+from backend.serialization import JsonSerializer, orjson
+
+# Размеры списков и количество повторов замера
+DEFAULT_SIZES = (100, 1000, 10000)
+REPEATS = 5
+
+
+# Бронирования с подгруженными ресурсом и сотрудником, как после joinedload
+def make_bookings(rows: int) -> list:
+    resources = [models.Resource(id=i + 1, name=f"Переговорная {i}", type="комната", capacity=8) for i in range(20)]
+    employees = [models.Employee(id=i + 1, full_name=f"Сотрудник {i}", email=f"user{i}@company.com") for i in range(50)]
+
+    bookings = []
+    start_date = date(2026, 1, 1)
+    for i in range(rows):
+        resource = resources[i % len(resources)]
+        employee = employees[i % len(employees)]
+        hour = 8 + i % 10
+        bookings.append(models.Booking(
+            id=i + 1,
+            resource_id=resource.id,
+            employee_id=employee.id,
+            date=start_date + timedelta(days=i // 100),
+            start_time=time(hour, 0),
+            end_time=time(hour, 30),
+            resource=resource,
+            employee=employee
+        ))
+    return bookings
+
+
+# Сериализаторы: название -> функция списка объектов ORM в байты JSON
+def serializers() -> dict:
+    adapter = TypeAdapter(List[schemas.BookingDetail])
+    fast = JsonSerializer(schemas.BookingDetail, many=True)
+
+    # Проверка схемы, словари и стандартный json (jsonable путь FastAPI)
+    def stdlib(items):
+        validated = adapter.validate_python(items, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+    result = {
+        "response_model + json": stdlib,
+        "response_model + dump_json": fast.dump_json_validated,
+    }
+    if orjson is not None:
+        result["trusted + orjson"] = fast.dump_json_trusted
+    return result
+
+
+def main(sizes) -> int:
+    paths = serializers()
+    print("=" * 72)
+    print(f"Сериализация BookingDetail, мкс на строку (лучший из {REPEATS} замеров)")
+    print("=" * 72)
+    print(f"{'путь':<30}" + "".join(f"{size:>14}" for size in sizes))
+
+    results = {name: [] for name in paths}
+    for size in sizes:
+        bookings = make_bookings(size)
+        expected = json.loads(paths["response_model + json"](bookings))
+        for name, serialize in paths.items():
+            # Все пути должны давать одинаковый JSON
+            if json.loads(serialize(bookings)) != expected:
+                print(f"Путь '{name}' дает другой JSON")
+                return 1
+            number = max(1, 20000 // size)
+            best = min(timeit.repeat(lambda: serialize(bookings), number=number, repeat=REPEATS)) / number
+            results[name].append(best / size * 1e6)
+
+    for name, per_row in results.items():
+        print(f"{name:<30}" + "".join(f"{value:>14.2f}" for value in per_row))
+
+    baseline = results["response_model + json"]
+    for name, per_row in list(results.items())[1:]:
+        speedup = ", ".join(f"x{base / value:.1f}" for base, value in zip(baseline, per_row))
+        print(f"Ускорение '{name}': {speedup}")
+    return 0
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    sys.exit(main(sizes))
@@ -0,0 +1,183 @@
+# Модуль ленты изменений бронирований.
+# Функции crud после commit публикуют события created/updated/deleted в канал
+# хранилища кэша (cache_backend), поэтому события доходят до подписчиков всех
+# воркеров. Каждый воркер раскладывает полученные события по очередям своих
+# подписчиков с учетом фильтров по ресурсам и датам; эндпоинт /bookings/stream
+# отдает их клиентам как Server-Sent Events.
+
+from datetime import date
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Set
+import asyncio
+import json
+import os
+
+from backend.cache import cache_backend, call_backend_sync
+from backend.cache_backend import CacheBackend
+
+# Канал событий бронирований в хранилище кэша
+BOOKING_EVENTS_CHANNEL = "booking_events"
+
+# Размер очереди подписчика: отставший клиент получает событие reset и отключается
+BOOKING_EVENTS_QUEUE_SIZE = int(os.getenv("BOOKING_EVENTS_QUEUE_SIZE", "1000"))
+# Интервал комментариев keep-alive в потоке, секунды
+BOOKING_EVENTS_KEEPALIVE = float(os.getenv("BOOKING_EVENTS_KEEPALIVE", "15"))
+
+
+# Событие изменения бронирования: тип и поля бронирования в формате JSON
+def booking_event(event_type: str, booking: Any, previous: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Аргументы:
+        event_type: created, updated или deleted
+        booking: Бронирование (объект ORM, схема или строка с такими же полями)
+        previous: Бронирование до изменения, если у него поменялись ресурс или дата
+
+    Результаты:
+        Словарь события с полями бронирования
+    """
+    event = {"type": event_type, "booking": _booking_fields(booking)}
+    if previous is not None:
+        event["previous"] = {"resource_id": previous[0], "date": previous[1].isoformat()}
+    return event
+
+
+def _booking_fields(booking: Any) -> Dict[str, Any]:
+    return {
+        "id": booking.id,
+        "resource_id": booking.resource_id,
+        "employee_id": getattr(booking, "employee_id", None),
+        "date": booking.date.isoformat(),
+        "start_time": booking.start_time.isoformat() if booking.start_time is not None else None,
+        "end_time": booking.end_time.isoformat() if booking.end_time is not None else None,
+        "series_id": getattr(booking, "series_id", None),
+    }
+
+
+# Сообщение Server-Sent Events
+def format_sse(event_type: str, data: Any) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class Subscription:
+    """
+    Подписка на события бронирований в цикле событий воркера.
+
+    Аргументы:
+        loop: Цикл событий, в котором читается очередь
+        resource_ids: Ресурсы, события которых нужны (None - все)
+        dates: Даты, события которых нужны (None - все)
+
+    Атрибуты:
+        overflowed: Очередь переполнилась, часть событий потеряна
+    """
+
+    def __init__(self, loop, resource_ids: Optional[Iterable[int]] = None, dates: Optional[Iterable[date]] = None):
+        self.loop = loop
+        self.resource_ids: Optional[Set[int]] = set(resource_ids) if resource_ids else None
+        self.dates: Optional[Set[str]] = {value.isoformat() for value in dates} if dates else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=BOOKING_EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    # Событие подходит под фильтр, если до или после изменения оно касалось
+    # одного из выбранных ресурсов в одну из выбранных дат
+    def matches(self, event: Dict[str, Any]) -> bool:
+        targets = [event["booking"]]
+        if "previous" in event:
+            targets.append(event["previous"])
+        return any(
+            (self.resource_ids is None or target["resource_id"] in self.resource_ids)
+            and (self.dates is None or target["date"] in self.dates)
+            for target in targets
+        )
+
+    # Вызывается в цикле событий подписчика
+    def _put(self, event: Dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._end()
+
+    # Завершение потока: читатель получит None (событие reset) и отключится.
+    # Вызывается в цикле событий подписчика
+    def _end(self) -> None:
+        self.overflowed = True
+        # Пробуждение читателя, ожидающего очередь
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        event = await self.queue.get()
+        return None if self.overflowed else event
+
+
+class BookingEventBus:
+    """
+    Публикация событий бронирований и их доставка подписчикам процесса.
+
+    Аргументы:
+        backend: Хранилище с каналом сообщений, общим для воркеров
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._subscriptions: List[Subscription] = []
+        self._lock = Lock()
+        self._subscribed = False
+
+    # Публикация событий одной записи одним сообщением
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        if events:
+            call_backend_sync(self.backend.publish, BOOKING_EVENTS_CHANNEL, json.dumps(events))
+
+    def subscribe(
+        self,
+        resource_ids: Optional[Iterable[int]] = None,
+        dates: Optional[Iterable[date]] = None
+    ) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), resource_ids, dates)
+        with self._lock:
+            # Канал слушается только процессами, у которых есть подписчики
+            if not self._subscribed:
+                self.backend.subscribe(BOOKING_EVENTS_CHANNEL, self._on_message, on_reset=self.close)
+                self._subscribed = True
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    # Завершение потоков всех подписчиков процесса при остановке сервера или
+    # возможной потере событий (переподключение к хранилищу): клиенты
+    # получают reset, переподключаются и перечитывают данные
+    def close(self) -> None:
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._end)
+            except RuntimeError:
+                pass
+
+    # Сообщения приходят в потоке записи или в потоке подписки хранилища:
+    # события передаются в цикл событий каждого подписчика
+    def _on_message(self, message: str) -> None:
+        events = json.loads(message)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for event in events:
+                if subscription.matches(event):
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription._put, event)
+                    except RuntimeError:
+                        # Цикл событий подписчика уже закрыт
+                        self.unsubscribe(subscription)
+                        break
+
+
+booking_events = BookingEventBus(cache_backend)
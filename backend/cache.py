@@ -0,0 +1,236 @@
+# Модуль HTTP кэширования ответов по версиям таблиц.
+# Для каждой таблицы хранится счетчик версии, который увеличивают функции crud
+# после записи. ETag ответа строится из версий таблиц, от которых он зависит,
+# поэтому проверка If-None-Match не требует обращения к БД. Сериализованные
+# ответы и результаты запросов хранятся в хранилище кэша (cache_backend) под
+# ключом с версиями, поэтому после записи они больше не выдаются.
+# Счетчики и эпоха хранилища читаются из хранилища одним запросом при каждой
+# проверке, поэтому потеря сообщений или сброс хранилища не приводят к выдаче
+# устаревших ответов. Изменения счетчиков также публикуются всем воркерам
+# для сброса их локальных структур (индекса интервалов).
+
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import os
+import uuid
+
+from fastapi import Request, Response, status
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
+
+from backend.cache_backend import CACHE_TTL, CacheBackend, create_cache_backend
+
+# Таблицы, версии которых учитываются кэшем
+EMPLOYEES = "employees"
+RESOURCES = "resources"
+BOOKINGS = "bookings"
+TABLES = (EMPLOYEES, RESOURCES, BOOKINGS)
+
+# Канал сообщений об изменении версий: "<процесс>:<таблица>:<версия>"
+INVALIDATION_CHANNEL = "invalidation"
+# Ключ эпохи хранилища
+EPOCH_KEY = "epoch"
+
+
+class TableVersions:
+    """
+    Счетчики версий таблиц в хранилище кэша.
+
+    Аргументы:
+        backend: Хранилище счетчиков и канала инвалидации
+
+    Эпоха - идентификатор состояния хранилища: она входит в ETag, поэтому
+    после сброса хранилища (перезапуск, FLUSH, вытеснение ключей) ETag
+    не совпадают с выданными ранее, даже если счетчики начались заново.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.origin = uuid.uuid4().hex
+        self._listeners: List[Callable[[str], None]] = []
+        backend.subscribe(INVALIDATION_CHANNEL, self._on_message, on_reset=self._on_reset)
+
+    @staticmethod
+    def _key(table: str) -> str:
+        return f"version:{table}"
+
+    # Эпоха и текущие версии таблиц одним запросом к хранилищу
+    def snapshot(self, tables: Sequence[str]) -> Tuple[str, Tuple[int, ...]]:
+        epoch, versions = self.backend.get_snapshot(EPOCH_KEY, [self._key(table) for table in tables])
+        if epoch is None:
+            # Хранилище сброшено: новая эпоха (или эпоха, созданная другим процессом)
+            epoch = self.backend.add(EPOCH_KEY, uuid.uuid4().hex[:8].encode())
+        return epoch.decode(), tuple(versions)
+
+    # Увеличение версий таблиц после записи и публикация изменений
+    def bump(self, *tables: str) -> None:
+        call_backend_sync(self._bump, tables)
+
+    def _bump(self, tables: Sequence[str]) -> None:
+        for table in tables:
+            version = self.backend.incr(self._key(table))
+            if version == 1:
+                # Счетчик создан заново - первая запись или потеря ключа в хранилище:
+                # смена эпохи исключает совпадение с ETag, выданными до потери
+                self.backend.set(EPOCH_KEY, uuid.uuid4().hex[:8].encode())
+            self.backend.publish(INVALIDATION_CHANNEL, f"{self.origin}:{table}:{version}")
+
+    # Подписка на изменения таблиц, сделанные другими процессами
+    def on_remote_change(self, listener: Callable[[str], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, table: str) -> None:
+        for listener in self._listeners:
+            listener(table)
+
+    def _on_message(self, message: str) -> None:
+        origin, table, _ = message.rsplit(":", 2)
+        if origin != self.origin:
+            self._notify(table)
+
+    # Сообщения могли быть потеряны: изменившимися считаются все таблицы
+    def _on_reset(self) -> None:
+        for table in TABLES:
+            self._notify(table)
+
+
+class CachedResponse(NamedTuple):
+    """
+    Атрибуты:
+        body: Сериализованное тело ответа
+        headers: Дополнительные заголовки ответа (например, X-Next-Cursor)
+    """
+    body: bytes
+    headers: Dict[str, str]
+
+    def encode(self) -> bytes:
+        return json.dumps(self.headers).encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "CachedResponse":
+        headers, body = raw.split(b"\n", 1)
+        return cls(body, json.loads(headers))
+
+
+# Время, в течение которого клиент может не перепроверять ответ
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+
+cache_backend = create_cache_backend()
+
+
+# Вызов хранилища из асинхронного обработчика: сетевое хранилище
+# вызывается в пуле потоков, чтобы не блокировать цикл событий
+async def call_backend(operation: Callable[..., Any], *args) -> Any:
+    if cache_backend.remote:
+        return await run_in_threadpool(operation, *args)
+    return operation(*args)
+
+
+# Вызов хранилища из функций crud. В асинхронном стеке БД они выполняются
+# в greenlet цикла событий (AsyncSession.run_sync): сетевой вызов переносится
+# в пул потоков и ожидается так же, как запросы к БД
+def call_backend_sync(operation: Callable[..., Any], *args) -> Any:
+    if cache_backend.remote and in_greenlet():
+        return await_only(run_in_threadpool(operation, *args))
+    return operation(*args)
+
+
+table_versions = TableVersions(cache_backend)
+
+
+# ETag ответа по эпохе хранилища и версиям таблиц
+def make_etag(tables: Sequence[str]) -> str:
+    epoch, versions = table_versions.snapshot(tables)
+    parts = "-".join(f"{table}.{version}" for table, version in zip(tables, versions))
+    return f'"{epoch}-{parts}"'
+
+
+# Проверка заголовка If-None-Match (список ETag). "*" не учитывается:
+# ETag известен до выполнения обработчика, а "*" совпадает только
+# с существующим представлением, которого может и не быть (404)
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _cache_control() -> str:
+    if RESPONSE_CACHE_MAX_AGE > 0:
+        return f"max-age={RESPONSE_CACHE_MAX_AGE}, must-revalidate"
+    return "no-cache"
+
+
+# Ответ GET эндпоинта с ETag, 304 и кэшем сериализованных ответов
+async def cached_response(
+    request: Request,
+    tables: Sequence[str],
+    build: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]]
+) -> Response:
+    """
+    Аргументы:
+        request: Запрос (ключ кэша - путь и параметры запроса)
+        tables: Таблицы, от которых зависит ответ
+        build: Построение ответа при промахе: (тело JSON, дополнительные заголовки)
+
+    Результаты:
+        304 без тела, если клиент прислал актуальный ETag; иначе ответ из кэша
+        или построенный build. Версии снимаются до чтения данных, поэтому
+        запись во время построения приводит к промаху при следующем запросе.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    resource = f"{request.url.path}?{request.url.query}"
+
+    # Версии и кэшированный ответ - одним обращением к хранилищу
+    def lookup() -> Tuple[str, bool, Optional[bytes]]:
+        etag = make_etag(tables)
+        if etag_matches(if_none_match, etag):
+            return etag, True, None
+        return etag, False, cache_backend.get(f"response:{etag}:{resource}")
+
+    etag, not_modified, raw = await call_backend(lookup)
+    headers = {"ETag": etag, "Cache-Control": _cache_control()}
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if raw is not None:
+        entry = CachedResponse.decode(raw)
+    else:
+        body, extra_headers = await build()
+        entry = CachedResponse(body, extra_headers)
+        await call_backend(cache_backend.set, f"response:{etag}:{resource}", entry.encode(), CACHE_TTL)
+
+    return Response(
+        content=entry.body,
+        media_type="application/json",
+        headers={**entry.headers, **headers}
+    )
+
+
+# Результат запроса к БД из кэша по версиям таблиц
+def cached_value(namespace: str, tables: Sequence[str], params: Dict[str, Any], loader: Callable[[], Any]) -> Any:
+    """
+    Аргументы:
+        namespace: Имя запроса
+        tables: Таблицы, от которых зависит результат
+        params: Параметры запроса (часть ключа)
+        loader: Выполнение запроса при промахе; результат должен сериализоваться в JSON
+
+    Результаты:
+        Результат loader в виде, восстановленном из JSON
+    """
+    params_key = json.dumps(params, sort_keys=True, default=str)
+
+    # Версии и кэшированное значение - одним обращением к хранилищу
+    def lookup() -> Tuple[str, Optional[bytes]]:
+        key = f"value:{namespace}:{make_etag(tables)}:{params_key}"
+        return key, cache_backend.get(key)
+
+    key, raw = call_backend_sync(lookup)
+    if raw is not None:
+        return json.loads(raw)
+
+    value = loader()
+    call_backend_sync(cache_backend.set, key, json.dumps(value, default=str).encode(), CACHE_TTL)
+    return value
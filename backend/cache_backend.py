@@ -0,0 +1,244 @@
+# Модуль хранилищ кэша.
+# Кэш ответов, версии таблиц и сообщения об инвалидации хранятся в бэкенде:
+# в памяти процесса (по умолчанию) или в Redis, общем для всех воркеров.
+# Выбор задается переменной окружения CACHE_BACKEND=memory|redis.
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import os
+import time
+
+
+class CacheBackend(ABC):
+    """
+    Интерфейс хранилища кэша. Реализация должна определить все методы:
+    неполная реализация не создается.
+
+    Значения - байты; счетчики - целые числа, увеличиваемые атомарно;
+    сообщения публикуются в канал и доставляются подписчикам всех процессов,
+    подключенных к тому же хранилищу.
+
+    Атрибуты:
+        remote: Обращение к хранилищу - сетевой запрос (вызывать вне цикла событий)
+    """
+
+    remote = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        ...
+
+    # Запись значения, только если ключа нет; возвращает текущее значение
+    @abstractmethod
+    def add(self, key: str, value: bytes) -> bytes:
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+    # Значение и счетчики одним запросом (None и 0 для отсутствующих ключей)
+    @abstractmethod
+    def get_snapshot(self, key: str, counter_keys: Sequence[str]) -> Tuple[Optional[bytes], List[int]]:
+        ...
+
+    @abstractmethod
+    def publish(self, channel: str, message: str) -> None:
+        ...
+
+    # on_reset вызывается, если сообщения канала могли быть потеряны
+    # (разрыв и восстановление соединения подписки)
+    @abstractmethod
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_reset: Optional[Callable[[], None]] = None
+    ) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Хранилище в памяти процесса с вытеснением LRU и временем жизни значений.
+
+    Аргументы:
+        max_entries: Максимальное число хранимых значений
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        # Ключ -> (значение, момент истечения или None)
+        self._values = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._values[key] = (value, expires_at)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def add(self, key: str, value: bytes) -> bytes:
+        with self._lock:
+            item = self._values.setdefault(key, (value, None))
+            return item[0]
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_snapshot(self, key: str, counter_keys: Sequence[str]) -> Tuple[Optional[bytes], List[int]]:
+        value = self.get(key)
+        with self._lock:
+            return value, [self._counters.get(counter_key, 0) for counter_key in counter_keys]
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(channel, []))
+        for handler in handlers:
+            handler(message)
+
+    # Сообщения доставляются синхронно и не теряются: on_reset не вызывается
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_reset: Optional[Callable[[], None]] = None
+    ) -> None:
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Хранилище в Redis, общее для всех воркеров. Подходит любой клиент
+    с протоколом redis-py, в том числе fakeredis.FakeRedis для локального запуска.
+
+    Аргументы:
+        client: Клиент Redis
+        key_prefix: Префикс ключей и каналов приложения
+    """
+
+    remote = True
+
+    def __init__(self, client, key_prefix: str = "booking:"):
+        self.client = client
+        self.key_prefix = key_prefix
+        self._pubsub = None
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._lock = Lock()
+
+    def _key(self, key: str) -> str:
+        return self.key_prefix + key
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(key))
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self.client.set(self._key(key), value, ex=ttl or None)
+
+    def add(self, key: str, value: bytes) -> bytes:
+        self.client.set(self._key(key), value, nx=True)
+        return self.client.get(self._key(key))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self._key(key)))
+
+    def get_snapshot(self, key: str, counter_keys: Sequence[str]) -> Tuple[Optional[bytes], List[int]]:
+        values = self.client.mget([self._key(key)] + [self._key(counter_key) for counter_key in counter_keys])
+        return values[0], [int(value) if value is not None else 0 for value in values[1:]]
+
+    def publish(self, channel: str, message: str) -> None:
+        self.client.publish(self._key(channel), message)
+
+    # Подписка обслуживается одним фоновым потоком на все каналы.
+    # Ошибки соединения не останавливают поток: redis-py переподключается
+    # и переподписывается сам, а подписчики узнают о возможной потере сообщений
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_reset: Optional[Callable[[], None]] = None
+    ) -> None:
+        with self._lock:
+            if channel not in self._handlers:
+                self._handlers[channel] = []
+                if self._pubsub is None:
+                    self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(**{self._key(channel): self._dispatch})
+                if len(self._handlers) == 1:
+                    # Соединение подписки уже установлено: дальнейшие вызовы - переподключения
+                    self._pubsub.connection.register_connect_callback(self._on_reconnect)
+                    self._pubsub.run_in_thread(
+                        sleep_time=0.1, daemon=True, exception_handler=self._on_subscription_error
+                    )
+            self._handlers[channel].append(handler)
+            if on_reset is not None:
+                self._reset_handlers.append(on_reset)
+
+    def _on_reconnect(self, connection) -> None:
+        self._reset()
+
+    def _on_subscription_error(self, error, pubsub, thread) -> None:
+        # Пауза перед следующей попыткой чтения, чтобы недоступный Redis не загружал поток
+        time.sleep(PUBSUB_RETRY_DELAY)
+        self._reset()
+
+    def _reset(self) -> None:
+        with self._lock:
+            handlers = list(self._reset_handlers)
+        for handler in handlers:
+            handler()
+
+    def _dispatch(self, message) -> None:
+        channel = message["channel"]
+        channel = channel.decode() if isinstance(channel, bytes) else channel
+        data = message["data"]
+        data = data.decode() if isinstance(data, bytes) else data
+        with self._lock:
+            handlers = list(self._handlers.get(channel[len(self.key_prefix):], []))
+        for handler in handlers:
+            handler(data)
+
+
+# Параметры кэша
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# Время жизни значений: записи устаревших версий просто истекают
+CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+# Пауза после ошибки соединения подписки, секунды
+PUBSUB_RETRY_DELAY = float(os.getenv("CACHE_PUBSUB_RETRY_DELAY", "1"))
+
+
+# Создание хранилища по конфигурации; redis импортируется только при его выборе
+def create_cache_backend() -> CacheBackend:
+    if CACHE_BACKEND == "redis":
+        import redis
+
+        return RedisCacheBackend(redis.Redis.from_url(CACHE_REDIS_URL))
+    return MemoryCacheBackend(max_entries=CACHE_MAX_ENTRIES)
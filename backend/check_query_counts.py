@@ -0,0 +1,107 @@
+# Скрипт проверки количества SQL запросов на эндпоинтах списков бронирований и синхронизации.
+# Заполняет временную БД данными двух размеров и сравнивает число запросов:
+# если оно растет вместе с количеством строк, значит появилась проблема N+1.
+#
+# Запуск: python -m backend.check_query_counts
+
+import os
+import sys
+import tempfile
+from datetime import date, time
+
+# Временная БД, чтобы не трогать рабочие данные
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'query_counts.db')}"
+
+from fastapi.testclient import TestClient
+
+from backend import models
+from backend.database import Base, SessionLocal, QueryCounter, engine
+from backend.main import app
+
+# Размеры наборов данных для сравнения
+SMALL_SIZE = 3
+LARGE_SIZE = 30
+
+
+# Заполнение БД: у первого ресурса бронирования разных сотрудников,
+# у первого сотрудника бронирования разных ресурсов, чтобы ленивые
+# загрузки не попадали в identity map сессии
+def seed(rows: int) -> dict:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        resources = [models.Resource(name=f"Ресурс {i}", type="комната", capacity=4) for i in range(rows)]
+        employees = [models.Employee(full_name=f"Сотрудник {i}", email=f"user{i}@company.com") for i in range(rows)]
+        db.add_all(resources + employees)
+        db.flush()
+
+        today = date.today()
+        for i in range(rows):
+            # Интервалы по 15 минут начиная с 08:00
+            start_minutes = 8 * 60 + i * 15
+            start = time(start_minutes // 60, start_minutes % 60)
+            end = time((start_minutes + 15) // 60, (start_minutes + 15) % 60)
+            db.add(models.Booking(resource_id=resources[0].id, employee_id=employees[i].id,
+                                  date=today, start_time=start, end_time=end))
+            if i > 0:
+                db.add(models.Booking(resource_id=resources[i].id, employee_id=employees[0].id,
+                                      date=today, start_time=start, end_time=end))
+        db.commit()
+        return {"resource_id": resources[0].id, "employee_id": employees[0].id, "date": str(today)}
+    finally:
+        db.close()
+
+
+# Список проверяемых эндпоинтов: (название, путь)
+def endpoints(ids: dict) -> list:
+    return [
+        ("/bookings/", "/bookings/"),
+        ("/bookings/today", "/bookings/today"),
+        ("/bookings/search", f"/bookings/search?date_from={ids['date']}"),
+        ("/bookings/export", f"/bookings/export?format=csv&date_from={ids['date']}"),
+        ("/bookings/by_resource/{id}", f"/bookings/by_resource/{ids['resource_id']}"),
+        ("/bookings/by_employee/{id}", f"/bookings/by_employee/{ids['employee_id']}"),
+        ("/sync/changes", "/sync/changes"),
+    ]
+
+
+# Подсчет запросов для каждого эндпоинта
+def measure(client: TestClient, rows: int) -> dict:
+    ids = seed(rows)
+    counts = {}
+    for name, path in endpoints(ids):
+        with QueryCounter() as counter:
+            response = client.get(path)
+        response.raise_for_status()
+        counts[name] = counter.count
+    return counts
+
+
+def main() -> int:
+    client = TestClient(app)
+
+    small = measure(client, SMALL_SIZE)
+    large = measure(client, LARGE_SIZE)
+
+    print("=" * 60)
+    print(f"Количество SQL запросов ({SMALL_SIZE} строк / {LARGE_SIZE} строк)")
+    print("=" * 60)
+
+    failed = False
+    for name, small_count in small.items():
+        large_count = large[name]
+        status = "OK" if large_count == small_count else "FAIL"
+        failed = failed or status == "FAIL"
+        print(f"[{status}] {name}: {small_count} / {large_count}")
+
+    if failed:
+        print("Количество запросов растет с числом строк (N+1)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
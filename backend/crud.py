@@ -1,12 +1,24 @@
 # Модуль CRUD операций для работы с базой данных
 # Содержит функции для создания, чтения, обновления и удаления записей
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from datetime import date, datetime, timedelta
-from typing import List, Optional
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import Date, Integer, and_, cast, column, delete, func, insert, literal, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, time, timedelta
+from collections import defaultdict
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule
+from itertools import islice, takewhile
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from backend import models
 from backend import schemas
+from backend.database import begin_write_transaction, run_with_lock_retry
+from backend.pagination import Page, keyset_page
+from backend.interval_index import INTERVAL_INDEX_ENABLED, DayIntervals, booking_intervals
+from backend.cache import BOOKINGS, EMPLOYEES, RESOURCES, cached_value, table_versions
+from backend.booking_events import booking_event, booking_events
+from backend.occupancy import encode_mask, minutes_of, occupancy_mask, slot_count
+from backend.heatmap import DAYS_PER_WEEK, HeatmapAccumulator, utilisation_percent, working_minutes_by_hour
 
 
 
@@ -19,9 +31,9 @@ def get_employee(db: Session, employee_id: int) -> Optional[models.Employee]:
 def get_employee_by_email(db: Session, email: str) -> Optional[models.Employee]:
     return db.query(models.Employee).filter(models.Employee.email == email).first()
 
-# Получение списка всех сотрудников порционно
-def get_employees(db: Session, skip: int = 0, limit: int = 100) -> List[models.Employee]:
-    return db.query(models.Employee).offset(skip).limit(limit).all()
+# Получение списка всех сотрудников порционно (по курсору или, устаревшее, со смещением)
+def get_employees(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+    return keyset_page(db.query(models.Employee), [models.Employee.id], cursor=cursor, limit=limit, skip=skip)
 
 # Создание нового сотрудника
 def create_employee(db: Session, employee: schemas.EmployeeCreate) -> models.Employee:
@@ -34,6 +46,7 @@ def create_employee(db: Session, employee: schemas.EmployeeCreate) -> models.Emp
     # Внесение изменений в БД
     db.add(db_employee)
     db.commit()
+    table_versions.bump(EMPLOYEES)
     db.refresh(db_employee)
     return db_employee
 
@@ -51,6 +64,7 @@ def update_employee(db: Session, employee_id: int, employee: schemas.EmployeeUpd
 
     # Внесение изменений в БД
     db.commit()
+    table_versions.bump(EMPLOYEES)
     db.refresh(db_employee)
     return db_employee
 
@@ -63,9 +77,26 @@ def delete_employee(db: Session, employee_id: int) -> bool:
     if not db_employee:
         return False
 
-    # Внесение изменений в БД
+    # Бронирования сотрудника удаляются каскадно, их вклад вычитается из суточной загрузки
+    intervals = [
+        (db_booking.resource_id, db_booking.date, db_booking.start_time, db_booking.end_time)
+        for db_booking in db_employee.bookings
+    ]
+    booking_days = {interval[:2] for interval in intervals}
+    events = [booking_event("deleted", db_booking) for db_booking in db_employee.bookings]
+    apply_daily_usage_deltas(db, daily_usage_deltas(intervals, sign=-1))
+
+    # Внесение изменений в БД вместе с сериями сотрудника
     db.delete(db_employee)
+    db.flush()
+    db.query(models.BookingSeries).filter(
+        models.BookingSeries.employee_id == employee_id
+    ).delete(synchronize_session=False)
     db.commit()
+    table_versions.bump(EMPLOYEES, BOOKINGS)
+    for resource_id, booking_date in booking_days:
+        booking_intervals.invalidate(resource_id, booking_date)
+    booking_events.publish(events)
 
     return True
 
@@ -75,9 +106,9 @@ def delete_employee(db: Session, employee_id: int) -> bool:
 def get_resource(db: Session, resource_id: int) -> Optional[models.Resource]:
     return db.query(models.Resource).filter(models.Resource.id == resource_id).first()
 
-# Получение списка всех ресурсов порционно
-def get_resources(db: Session, skip: int = 0, limit: int = 100) -> List[models.Resource]:
-    return db.query(models.Resource).offset(skip).limit(limit).all()
+# Получение списка всех ресурсов порционно (по курсору или, устаревшее, со смещением)
+def get_resources(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+    return keyset_page(db.query(models.Resource), [models.Resource.id], cursor=cursor, limit=limit, skip=skip)
 
 # Создние нового ресурса
 def create_resource(db: Session, resource: schemas.ResourceCreate) -> models.Resource:
@@ -90,6 +121,7 @@ def create_resource(db: Session, resource: schemas.ResourceCreate) -> models.Res
     # Внесение изменений в БД
     db.add(db_resource)
     db.commit()
+    table_versions.bump(RESOURCES)
     db.refresh(db_resource)
     return db_resource
 
@@ -107,6 +139,7 @@ def update_resource(db: Session, resource_id: int, resource: schemas.ResourceUpd
 
     # Внесение изменений в БД
     db.commit()
+    table_versions.bump(RESOURCES)
     db.refresh(db_resource)
     return db_resource
 
@@ -119,21 +152,67 @@ def delete_resource(db: Session, resource_id: int) -> bool:
     if not db_resource:
         return False
 
-    # Внесение изменений в БД
+    # События удаления бронирований ресурса, удаляемых каскадно
+    events = [booking_event("deleted", db_booking) for db_booking in db_resource.bookings]
+
+    # Суточная загрузка ресурса удаляется вместе с его бронированиями
+    db.query(models.BookingDailyUsage).filter(
+        models.BookingDailyUsage.resource_id == resource_id
+    ).delete(synchronize_session=False)
+
+    # Внесение изменений в БД вместе с сериями ресурса
     db.delete(db_resource)
+    db.flush()
+    db.query(models.BookingSeries).filter(
+        models.BookingSeries.resource_id == resource_id
+    ).delete(synchronize_session=False)
     db.commit()
+    table_versions.bump(RESOURCES, BOOKINGS)
+    booking_intervals.invalidate_resource(resource_id)
+    booking_events.publish(events)
     return True
 
 
 # Блок бронирований
 
+# Стратегия загрузки бронирований вместе с ресурсом и сотрудником.
+# Связи многие-к-одному подгружаются тем же запросом через JOIN,
+# поэтому сериализация BookingDetail не вызывает ленивых SELECT на каждую строку.
+BOOKING_DETAIL_OPTIONS = (
+    joinedload(models.Booking.resource),
+    joinedload(models.Booking.employee),
+)
+
+# Запрос бронирований с подгрузкой связанных объектов
+def query_booking_details(db: Session):
+    return db.query(models.Booking).options(*BOOKING_DETAIL_OPTIONS)
+
 # Получение бронирование по ID
 def get_booking(db: Session, booking_id: int) -> Optional[models.Booking]:
     return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
 
-# Получение списка всех бронирований порционно
-def get_bookings(db: Session, skip: int = 0, limit: int = 100) -> List[models.Booking]:
-    return db.query(models.Booking).offset(skip).limit(limit).all()
+# Получение бронирования по ID вместе с ресурсом и сотрудником
+def get_booking_detail(db: Session, booking_id: int) -> Optional[models.Booking]:
+    return query_booking_details(db).filter(models.Booking.id == booking_id).first()
+
+# Порядок сортировки списков бронирований (ключ курсора)
+BOOKING_ORDER = [models.Booking.date, models.Booking.start_time, models.Booking.id]
+
+# Получение списка всех бронирований порционно (по курсору или, устаревшее, со смещением)
+def get_bookings(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+    return keyset_page(query_booking_details(db), BOOKING_ORDER, cursor=cursor, limit=limit, skip=skip)
+
+# Получение интервалов бронирований ресурса за дату (для индекса интервалов)
+def get_day_intervals(db: Session, resource_id: int, booking_date: date) -> List[tuple]:
+    rows = db.query(
+        models.Booking.start_time,
+        models.Booking.end_time,
+        models.Booking.id
+    ).filter(
+        models.Booking.resource_id == resource_id,
+        models.Booking.date == booking_date
+    ).order_by(models.Booking.start_time).all()
+    return [tuple(row) for row in rows]
 
 # Проверка, есть ли конфликтующие бронирования для данного ресурса
 def check_booking_conflict(
@@ -158,6 +237,17 @@ def check_booking_conflict(
         false - нет конфликта
     """
 
+    # Проверка по индексу интервалов в памяти, если он включен
+    if INTERVAL_INDEX_ENABLED:
+        return booking_intervals.overlaps(
+            resource_id,
+            booking_date,
+            start_time,
+            end_time,
+            loader=lambda loader_resource_id, loader_date: get_day_intervals(db, loader_resource_id, loader_date),
+            exclude_id=exclude_booking_id
+        )
+
     # Проверка пересечения временных интервалов
     query = db.query(models.Booking).filter(
         and_(
@@ -174,105 +264,1597 @@ def check_booking_conflict(
 
     return query.first() is not None
 
+# Ошибка пересечения бронирований при записи
+class BookingConflictError(Exception):
+    """
+    Ресурс уже забронирован на выбранный промежуток времени.
+
+    Атрибуты:
+        dates: Даты с конфликтами (для серий бронирований)
+    """
+
+    def __init__(self, dates: Optional[List[date]] = None):
+        super().__init__(dates)
+        self.dates = dates or []
+
+
+# Проверка, что ошибка целостности вызвана триггером защиты от пересечений
+def is_booking_overlap_error(error: IntegrityError) -> bool:
+    return models.BOOKING_OVERLAP_MESSAGE in str(error.orig)
+
 # Создание нового бронирования
 def create_booking(db: Session, booking: schemas.BookingCreate) -> models.Booking:
-    # Создание бронирования
-    db_booking = models.Booking(
-        resource_id=booking.resource_id,
-        employee_id=booking.employee_id,
-        date=booking.date,
-        start_time=booking.start_time,
-        end_time=booking.end_time
-    )
+    """
+    Проверка пересечений и вставка выполняются в одной транзакции
+    с блокировкой на запись, поэтому параллельные запросы не могут
+    создать пересекающиеся бронирования.
 
-    # Внесение изменений в БД
-    db.add(db_booking)
-    db.commit()
+    Исключения:
+        BookingConflictError: Если ресурс уже занят в это время
+        DatabaseBusyError: Если БД осталась заблокирована после повторов
+    """
+    def write() -> models.Booking:
+        begin_write_transaction(db)
+
+        # Проверка на пересечение бронирований
+        if check_booking_conflict(
+            db,
+            resource_id=booking.resource_id,
+            booking_date=booking.date,
+            start_time=booking.start_time,
+            end_time=booking.end_time
+        ):
+            db.rollback()
+            raise BookingConflictError()
+
+        # Создание бронирования
+        db_booking = models.Booking(
+            resource_id=booking.resource_id,
+            employee_id=booking.employee_id,
+            date=booking.date,
+            start_time=booking.start_time,
+            end_time=booking.end_time
+        )
+
+        # Внесение изменений в БД вместе с суточной загрузкой ресурса
+        db.add(db_booking)
+        add_booking_to_daily_usage(db, db_booking)
+        db.commit()
+        return db_booking
+
+    try:
+        db_booking = run_with_lock_retry(db, write)
+    except IntegrityError as error:
+        db.rollback()
+        if is_booking_overlap_error(error):
+            raise BookingConflictError() from error
+        raise
+
+    table_versions.bump(BOOKINGS)
+    booking_intervals.invalidate(db_booking.resource_id, db_booking.date)
     db.refresh(db_booking)
+    booking_events.publish([booking_event("created", db_booking)])
     return db_booking
 
 # Обновление бронирования
 def update_booking(db: Session, booking_id: int, booking: schemas.BookingUpdate) -> Optional[models.Booking]:
-    # Получение бронирования
-    db_booking = get_booking(db, booking_id)
-    if not db_booking:
-        return None
+    """
+    Исключения:
+        BookingConflictError: Если новое время конфликтует с другими бронированиями
+        DatabaseBusyError: Если БД осталась заблокирована после повторов
+    """
+    def write():
+        begin_write_transaction(db)
 
-    # Внесение изменений в бронирование
-    update_data = booking.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_booking, key, value)
+        # Получение бронирования
+        db_booking = get_booking(db, booking_id)
+        if not db_booking:
+            db.rollback()
+            return None, None
 
-    # Внесение изменений в БД
-    db.commit()
+        # Внесение изменений в бронирование с переносом его вклада в суточную загрузку
+        old_key = (db_booking.resource_id, db_booking.date)
+        remove_booking_from_daily_usage(db, db_booking)
+        update_data = booking.model_dump(exclude_unset=True)
+        for key, value in update_data.items():
+            setattr(db_booking, key, value)
+
+        # Проверка на пересечение с другими бронированиями (исключая текущее)
+        if check_booking_conflict(
+            db,
+            resource_id=db_booking.resource_id,
+            booking_date=db_booking.date,
+            start_time=db_booking.start_time,
+            end_time=db_booking.end_time,
+            exclude_booking_id=booking_id
+        ):
+            db.rollback()
+            raise BookingConflictError()
+
+        add_booking_to_daily_usage(db, db_booking)
+
+        # Внесение изменений в БД
+        db.commit()
+        return db_booking, old_key
+
+    try:
+        db_booking, old_key = run_with_lock_retry(db, write)
+    except IntegrityError as error:
+        db.rollback()
+        if is_booking_overlap_error(error):
+            raise BookingConflictError() from error
+        raise
+
+    if db_booking is None:
+        return None
+
+    table_versions.bump(BOOKINGS)
+    booking_intervals.invalidate(*old_key)
+    booking_intervals.invalidate(db_booking.resource_id, db_booking.date)
     db.refresh(db_booking)
+    new_key = (db_booking.resource_id, db_booking.date)
+    booking_events.publish([booking_event("updated", db_booking, previous=old_key if old_key != new_key else None)])
     return db_booking
 
 # Удаление бронирования
 def delete_booking(db: Session, booking_id: int) -> bool:
-    # Получение бронирования
-    db_booking = get_booking(db, booking_id)
-    if not db_booking:
+    def write():
+        begin_write_transaction(db)
+
+        # Получение бронирования
+        db_booking = get_booking(db, booking_id)
+        if not db_booking:
+            db.rollback()
+            return None
+
+        # Внесение изменений в БД вместе с суточной загрузкой ресурса
+        event = booking_event("deleted", db_booking)
+        remove_booking_from_daily_usage(db, db_booking)
+        db.delete(db_booking)
+        db.commit()
+        return event
+
+    event = run_with_lock_retry(db, write)
+    if event is None:
         return False
 
-    # Внесение изменений в БД
-    db.delete(db_booking)
-    db.commit()
+    table_versions.bump(BOOKINGS)
+    booking_intervals.invalidate(event["booking"]["resource_id"], date.fromisoformat(event["booking"]["date"]))
+    booking_events.publish([event])
     return True
 
 
+# Блок массового создания бронирований
+# Получение интервалов существующих бронирований по парам (ресурс, дата) одним запросом
+def get_intervals_by_day(
+    db: Session,
+    resource_ids: Iterable[int],
+    dates: Iterable[date]
+) -> Dict[Tuple[int, date], List[tuple]]:
+    resource_ids, dates = set(resource_ids), set(dates)
+    intervals = defaultdict(list)
+    if not resource_ids or not dates:
+        return intervals
+
+    rows = db.query(
+        models.Booking.resource_id,
+        models.Booking.date,
+        models.Booking.start_time,
+        models.Booking.end_time,
+        models.Booking.id
+    ).filter(
+        models.Booking.resource_id.in_(resource_ids),
+        models.Booking.date.in_(dates)
+    ).all()
+
+    for resource_id, booking_date, start_time, end_time, booking_id in rows:
+        intervals[(resource_id, booking_date)].append((start_time, end_time, booking_id))
+    return intervals
+
+# Поиск конфликтов в пакете методом sort-and-sweep по каждой паре (ресурс, дата)
+def find_batch_conflicts(
+    candidates: List[tuple],
+    existing: Dict[Tuple[int, date], List[tuple]]
+) -> Set[int]:
+    """
+    Аргументы:
+        candidates: Новые бронирования (индекс, resource_id, date, start_time, end_time)
+        existing: Интервалы существующих бронирований по парам (ресурс, дата)
+
+    Результаты:
+        Индексы бронирований, пересекающихся с существующими или с уже принятыми из пакета.
+        Внутри пакета при пересечении остается бронирование с более ранним началом.
+    """
+    groups = defaultdict(list)
+    for candidate in candidates:
+        groups[(candidate[1], candidate[2])].append(candidate)
+
+    conflicts = set()
+    for key, items in groups.items():
+        existing_day = DayIntervals(existing.get(key, []))
+        items.sort(key=lambda item: (item[3], item[0]))
+
+        # Принятые интервалы идут по возрастанию начала, достаточно помнить максимальное окончание
+        accepted_end = None
+        for index, _, _, start_time, end_time in items:
+            if (accepted_end is not None and start_time < accepted_end) or existing_day.overlaps(start_time, end_time):
+                conflicts.add(index)
+                continue
+            accepted_end = end_time if accepted_end is None or end_time > accepted_end else accepted_end
+
+    return conflicts
+
+# Массовое создание бронирований
+def create_bookings_bulk(
+    db: Session,
+    bookings: List[schemas.BookingCreate],
+    all_or_nothing: bool = True
+) -> List[dict]:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        bookings: Бронирования для создания
+        all_or_nothing: При любой ошибке не создавать ни одного бронирования
+
+    Результаты:
+        Результаты по каждому бронированию в порядке пакета
+        (поля index, status, booking, detail схемы BookingBulkItemResult)
+
+    Исключения:
+        BookingConflictError: Если защита БД обнаружила пересечение
+        DatabaseBusyError: Если БД осталась заблокирована после повторов
+    """
+    def write():
+        begin_write_transaction(db)
+        results = [None] * len(bookings)
+
+        # Проверка существования ресурсов и сотрудников - по одному запросу
+        resource_ids = {booking.resource_id for booking in bookings}
+        employee_ids = {booking.employee_id for booking in bookings}
+        known_resources = {row[0] for row in db.query(models.Resource.id).filter(models.Resource.id.in_(resource_ids))}
+        known_employees = {row[0] for row in db.query(models.Employee.id).filter(models.Employee.id.in_(employee_ids))}
+
+        candidates = []
+        for index, booking in enumerate(bookings):
+            if booking.end_time <= booking.start_time:
+                results[index] = {"index": index, "status": "invalid", "detail": "Время завершения должно быть после времени начала"}
+            elif booking.resource_id not in known_resources:
+                results[index] = {"index": index, "status": "not_found", "detail": "Ресурс не найден"}
+            elif booking.employee_id not in known_employees:
+                results[index] = {"index": index, "status": "not_found", "detail": "Сотрудник не найден"}
+            else:
+                candidates.append((index, booking.resource_id, booking.date, booking.start_time, booking.end_time))
+
+        # Конфликты внутри пакета и с существующими бронированиями
+        existing = get_intervals_by_day(db, {item[1] for item in candidates}, {item[2] for item in candidates})
+        conflicts = find_batch_conflicts(candidates, existing)
+        for index in conflicts:
+            results[index] = {"index": index, "status": "conflict", "detail": "Ресурс уже забронирован на выбранный промежуток времени"}
+
+        accepted = [item for item in candidates if item[0] not in conflicts]
+        if all_or_nothing and len(accepted) < len(bookings):
+            db.rollback()
+            for item in accepted:
+                results[item[0]] = {"index": item[0], "status": "skipped", "detail": "Пакет отклонен из-за ошибок в других бронированиях"}
+            return results, set()
+
+        # Вставка принятых бронирований одним executemany и обновление суточной загрузки в той же транзакции
+        if accepted:
+            db.execute(insert(models.Booking), [
+                {
+                    "resource_id": resource_id,
+                    "employee_id": bookings[index].employee_id,
+                    "date": booking_date,
+                    "start_time": start_time,
+                    "end_time": end_time
+                }
+                for index, resource_id, booking_date, start_time, end_time in accepted
+            ])
+            apply_daily_usage_deltas(db, daily_usage_deltas(item[1:] for item in accepted))
+
+            # ID созданных бронирований: (ресурс, дата, начало) уникальны, так как бронирования не пересекаются
+            created_ids = {
+                (row.resource_id, row.date, row.start_time): row.id
+                for row in db.query(
+                    models.Booking.id,
+                    models.Booking.resource_id,
+                    models.Booking.date,
+                    models.Booking.start_time
+                ).filter(
+                    models.Booking.resource_id.in_({item[1] for item in accepted}),
+                    models.Booking.date.in_({item[2] for item in accepted})
+                )
+            }
+            for index, resource_id, booking_date, start_time, end_time in accepted:
+                results[index] = {
+                    "index": index,
+                    "status": "created",
+                    "booking": schemas.Booking(
+                        id=created_ids[(resource_id, booking_date, start_time)],
+                        resource_id=resource_id,
+                        employee_id=bookings[index].employee_id,
+                        date=booking_date,
+                        start_time=start_time,
+                        end_time=end_time
+                    )
+                }
+        db.commit()
+        return results, {(item[1], item[2]) for item in accepted}
+
+    try:
+        results, written_days = run_with_lock_retry(db, write)
+    except IntegrityError as error:
+        db.rollback()
+        if is_booking_overlap_error(error):
+            raise BookingConflictError() from error
+        raise
+
+    if written_days:
+        table_versions.bump(BOOKINGS)
+    for resource_id, booking_date in written_days:
+        booking_intervals.invalidate(resource_id, booking_date)
+    booking_events.publish([
+        booking_event("created", result["booking"]) for result in results if result["status"] == "created"
+    ])
+    return results
+
+
+# Блок серий повторяющихся бронирований
+# Максимальное количество повторений в серии
+MAX_SERIES_OCCURRENCES = 366
+
+SERIES_FREQUENCIES = {
+    "daily": DAILY,
+    "weekly": WEEKLY,
+    "monthly": MONTHLY,
+}
+
+# Развертывание правила повторения в список дат
+def expand_series_dates(
+    frequency: str,
+    interval: int,
+    start_date: date,
+    end_date: Optional[date] = None,
+    count: Optional[int] = None,
+    limit: int = MAX_SERIES_OCCURRENCES
+) -> List[date]:
+    """
+    Результаты:
+        Даты повторений; не более limit + 1, чтобы вызывающий код мог обнаружить превышение.
+        Для ежемесячных серий месяцы без нужного числа пропускаются.
+    """
+    # RFC 5545 запрещает count вместе с until: для серий, сохраненных с обоими
+    # полями, правило строится по count, а даты после end_date отбрасываются
+    rule = rrule(
+        SERIES_FREQUENCIES[frequency],
+        interval=interval,
+        dtstart=datetime.combine(start_date, time()),
+        until=datetime.combine(end_date, time()) if end_date is not None and count is None else None,
+        count=count
+    )
+    dates = (occurrence.date() for occurrence in rule)
+    if end_date is not None and count is not None:
+        dates = takewhile(lambda occurrence_date: occurrence_date <= end_date, dates)
+    return list(islice(dates, limit + 1))
+
+# Дата последнего повторения серии по ее правилу
+def series_last_date(db_series: models.BookingSeries) -> date:
+    return expand_series_dates(
+        db_series.frequency,
+        db_series.interval,
+        db_series.start_date,
+        end_date=db_series.end_date,
+        count=db_series.count
+    )[-1]
+
+# Интервалы бронирований ресурса за диапазон дат одним запросом по индексу
+def get_resource_intervals_in_range(
+    db: Session,
+    resource_id: int,
+    date_from: date,
+    date_to: date
+) -> Dict[date, List[tuple]]:
+    rows = db.query(
+        models.Booking.date,
+        models.Booking.start_time,
+        models.Booking.end_time,
+        models.Booking.id
+    ).filter(
+        models.Booking.resource_id == resource_id,
+        models.Booking.date >= date_from,
+        models.Booking.date <= date_to
+    ).all()
+
+    intervals = defaultdict(list)
+    for booking_date, start_time, end_time, booking_id in rows:
+        intervals[booking_date].append((start_time, end_time, booking_id))
+    return intervals
+
+# Даты, на которые интервал пересекается с существующими бронированиями
+def find_conflicting_dates(
+    intervals: Dict[date, List[tuple]],
+    dates: Iterable[date],
+    start_time: time,
+    end_time: time,
+    exclude_ids: Set[int] = frozenset()
+) -> List[date]:
+    conflicts = []
+    for occurrence_date in dates:
+        day = [interval for interval in intervals.get(occurrence_date, []) if interval[2] not in exclude_ids]
+        if DayIntervals(day).overlaps(start_time, end_time):
+            conflicts.append(occurrence_date)
+    return conflicts
+
+# Получение серии по ID
+def get_booking_series(db: Session, series_id: int) -> Optional[models.BookingSeries]:
+    return db.query(models.BookingSeries).filter(models.BookingSeries.id == series_id).first()
+
+# Создание серии с повторениями на заданные даты
+def create_booking_series(
+    db: Session,
+    series: schemas.BookingSeriesCreate,
+    dates: List[date]
+) -> dict:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        series: Данные серии
+        dates: Даты повторений (результат expand_series_dates)
+
+    Результаты:
+        Словарь с полями схемы BookingSeriesResult
+
+    Исключения:
+        BookingConflictError: Если есть занятые даты и series.skip_conflicts не задан,
+            либо свободных дат не осталось
+        DatabaseBusyError: Если БД осталась заблокирована после повторов
+    """
+    def write():
+        begin_write_transaction(db)
+
+        # Проверка всех повторений одним запросом по диапазону дат
+        existing = get_resource_intervals_in_range(db, series.resource_id, dates[0], dates[-1])
+        conflicts = find_conflicting_dates(existing, dates, series.start_time, series.end_time)
+        conflict_dates = set(conflicts)
+        free_dates = [occurrence_date for occurrence_date in dates if occurrence_date not in conflict_dates]
+        if (conflicts and not series.skip_conflicts) or not free_dates:
+            db.rollback()
+            raise BookingConflictError(conflicts)
+
+        # Создание серии и всех повторений в одной транзакции
+        db_series = models.BookingSeries(**series.model_dump(exclude={"skip_conflicts"}))
+        db.add(db_series)
+        db.flush()
+
+        db.execute(insert(models.Booking), [
+            {
+                "resource_id": series.resource_id,
+                "employee_id": series.employee_id,
+                "date": occurrence_date,
+                "start_time": series.start_time,
+                "end_time": series.end_time,
+                "series_id": db_series.id
+            }
+            for occurrence_date in free_dates
+        ])
+        apply_daily_usage_deltas(db, daily_usage_deltas(
+            (series.resource_id, occurrence_date, series.start_time, series.end_time)
+            for occurrence_date in free_dates
+        ))
+
+        db_bookings = db.query(models.Booking).filter(
+            models.Booking.series_id == db_series.id
+        ).order_by(models.Booking.date).all()
+
+        # Ответ формируется до commit, чтобы не перечитывать объекты после него
+        result = {
+            "series": schemas.BookingSeries.model_validate(db_series),
+            "bookings": [schemas.Booking.model_validate(db_booking) for db_booking in db_bookings],
+            "skipped_dates": conflicts
+        }
+        db.commit()
+        return result
+
+    try:
+        result = run_with_lock_retry(db, write)
+    except IntegrityError as error:
+        db.rollback()
+        if is_booking_overlap_error(error):
+            raise BookingConflictError() from error
+        raise
+
+    table_versions.bump(BOOKINGS)
+    for booking in result["bookings"]:
+        booking_intervals.invalidate(booking.resource_id, booking.date)
+    booking_events.publish([booking_event("created", booking) for booking in result["bookings"]])
+    return result
+
+# Изменение повторений серии начиная с даты ("это и последующие")
+def update_booking_series(
+    db: Session,
+    series_id: int,
+    changes: schemas.BookingSeriesUpdate,
+    from_date: Optional[date] = None
+) -> Optional[int]:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        series_id: ID серии
+        changes: Новые сотрудник и/или время повторений
+        from_date: Первая изменяемая дата; без нее изменяется вся серия
+
+    Результаты:
+        Количество измененных повторений или None, если серия не найдена.
+        При изменении с середины серии последующие повторения выделяются в новую серию.
+
+    Исключения:
+        BookingConflictError: Если новое время пересекается с другими бронированиями
+        DatabaseBusyError: Если БД осталась заблокирована после повторов
+    """
+    update_data = changes.model_dump(exclude_unset=True)
+
+    def write():
+        begin_write_transaction(db)
+
+        db_series = get_booking_series(db, series_id)
+        if db_series is None:
+            db.rollback()
+            return None, [], []
+
+        occurrences_filter = [models.Booking.series_id == series_id]
+        if from_date is not None:
+            occurrences_filter.append(models.Booking.date >= from_date)
+        occurrences = db.query(
+            models.Booking.id,
+            models.Booking.date,
+            models.Booking.start_time,
+            models.Booking.end_time
+        ).filter(*occurrences_filter).order_by(models.Booking.date).all()
+        if not occurrences:
+            db.rollback()
+            return 0, [], []
+
+        start_time = update_data.get("start_time", db_series.start_time)
+        end_time = update_data.get("end_time", db_series.end_time)
+        dates = [occurrence.date for occurrence in occurrences]
+
+        # Проверка нового времени одним запросом по диапазону дат
+        if "start_time" in update_data or "end_time" in update_data:
+            existing = get_resource_intervals_in_range(db, db_series.resource_id, dates[0], dates[-1])
+            conflicts = find_conflicting_dates(
+                existing, dates, start_time, end_time,
+                exclude_ids={occurrence.id for occurrence in occurrences}
+            )
+            if conflicts:
+                db.rollback()
+                raise BookingConflictError(conflicts)
+
+        # Изменение с середины серии: последующие повторения переходят в новую серию.
+        # Обе части серии после разделения ограничиваются датой окончания, а не количеством.
+        target_series = db_series
+        if from_date is not None and dates[0] > db_series.start_date:
+            target_series = models.BookingSeries(
+                resource_id=db_series.resource_id,
+                employee_id=db_series.employee_id,
+                frequency=db_series.frequency,
+                interval=db_series.interval,
+                start_date=dates[0],
+                end_date=series_last_date(db_series),
+                count=None,
+                start_time=db_series.start_time,
+                end_time=db_series.end_time
+            )
+            db.add(target_series)
+            db_series.end_date = dates[0] - timedelta(days=1)
+            db_series.count = None
+        for key, value in update_data.items():
+            setattr(target_series, key, value)
+        db.flush()
+
+        # Все повторения изменяются одним UPDATE
+        db.execute(
+            update(models.Booking).where(*occurrences_filter).values(series_id=target_series.id, **update_data),
+            execution_options={"synchronize_session": False}
+        )
+
+        deltas = daily_usage_deltas(
+            (db_series.resource_id, occurrence.date, occurrence.start_time, occurrence.end_time)
+            for occurrence in occurrences
+        )
+        for key, (seconds, count) in daily_usage_deltas(
+            (db_series.resource_id, occurrence_date, start_time, end_time) for occurrence_date in dates
+        ).items():
+            deltas[key] = (seconds - deltas[key][0], count - deltas[key][1])
+        apply_daily_usage_deltas(db, deltas)
+
+        # События изменения повторений с новыми значениями полей
+        events = [
+            booking_event("updated", schemas.Booking(
+                id=occurrence.id,
+                resource_id=db_series.resource_id,
+                employee_id=target_series.employee_id,
+                date=occurrence.date,
+                start_time=start_time,
+                end_time=end_time,
+                series_id=target_series.id
+            ))
+            for occurrence in occurrences
+        ]
+
+        db.commit()
+        return len(occurrences), [(db_series.resource_id, occurrence_date) for occurrence_date in dates], events
+
+    try:
+        affected, written_days, events = run_with_lock_retry(db, write)
+    except IntegrityError as error:
+        db.rollback()
+        if is_booking_overlap_error(error):
+            raise BookingConflictError() from error
+        raise
+
+    if written_days:
+        table_versions.bump(BOOKINGS)
+    for resource_id, booking_date in written_days:
+        booking_intervals.invalidate(resource_id, booking_date)
+    booking_events.publish(events)
+    return affected
+
+# Отмена повторений серии начиная с даты ("это и последующие")
+def cancel_booking_series(db: Session, series_id: int, from_date: Optional[date] = None) -> Optional[int]:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        series_id: ID серии
+        from_date: Первая отменяемая дата; без нее отменяется вся серия
+
+    Результаты:
+        Количество удаленных повторений или None, если серия не найдена
+    """
+    def write():
+        begin_write_transaction(db)
+
+        db_series = get_booking_series(db, series_id)
+        if db_series is None:
+            db.rollback()
+            return None, [], []
+
+        # Все повторения удаляются одним DELETE, удаленные интервалы нужны для суточной загрузки
+        statement = delete(models.Booking).where(models.Booking.series_id == series_id)
+        if from_date is not None:
+            statement = statement.where(models.Booking.date >= from_date)
+        deleted = db.execute(
+            statement.returning(
+                models.Booking.id,
+                models.Booking.resource_id,
+                models.Booking.employee_id,
+                models.Booking.date,
+                models.Booking.start_time,
+                models.Booking.end_time,
+                models.Booking.series_id
+            ),
+            execution_options={"synchronize_session": False}
+        ).all()
+        apply_daily_usage_deltas(db, daily_usage_deltas(
+            ((row.resource_id, row.date, row.start_time, row.end_time) for row in deleted),
+            sign=-1
+        ))
+
+        # Серия удаляется целиком или укорачивается до даты отмены
+        if from_date is None or from_date <= db_series.start_date:
+            db.delete(db_series)
+        else:
+            db_series.end_date = min(from_date - timedelta(days=1), series_last_date(db_series))
+            db_series.count = None
+
+        db.commit()
+        return len(deleted), [(row.resource_id, row.date) for row in deleted], [booking_event("deleted", row) for row in deleted]
+
+    deleted, written_days, events = run_with_lock_retry(db, write)
+    if written_days:
+        table_versions.bump(BOOKINGS)
+    for resource_id, booking_date in written_days:
+        booking_intervals.invalidate(resource_id, booking_date)
+    booking_events.publish(events)
+    return deleted
+
+
+# Блок доступности ресурсов
+# Поиск свободных промежутков дня методом sweep-line по отсортированным занятым интервалам
+def find_free_slots(
+    busy: List[tuple],
+    day_start: time,
+    day_end: time,
+    min_duration: int = 0
+) -> List[tuple]:
+    """
+    Аргументы:
+        busy: Занятые интервалы (start_time, end_time), по возрастанию начала
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+        min_duration: Минимальная длительность свободного промежутка в секундах
+
+    Результаты:
+        Свободные промежутки (start_time, end_time) не короче min_duration
+    """
+    free = []
+    cursor = day_start
+    for start_time, end_time in busy:
+        if start_time >= day_end:
+            break
+        if start_time > cursor:
+            free.append((cursor, start_time))
+        if end_time > cursor:
+            cursor = end_time
+    if cursor < day_end:
+        free.append((cursor, day_end))
+
+    return [
+        (start_time, end_time) for start_time, end_time in free
+        if booking_duration_seconds(start_time, end_time) >= min_duration
+    ]
+
+# Свободные промежутки ресурсов за период: один запрос ресурсов и один запрос бронирований
+def get_availability(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    day_start: time,
+    day_end: time,
+    min_duration: int = 0,
+    resource_type: Optional[str] = None,
+    min_capacity: Optional[int] = None
+) -> List[dict]:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        date_from: Начало периода (включительно)
+        date_to: Конец периода (включительно)
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+        min_duration: Минимальная длительность свободного промежутка в секундах
+        resource_type: Тип ресурса
+        min_capacity: Минимальная вместимость ресурса
+
+    Результаты:
+        Пары (ресурс, дата) с хотя бы одним подходящим свободным промежутком
+        (поля resource, date, free_slots схемы ResourceAvailability)
+    """
+    resources_query = db.query(models.Resource)
+    if resource_type is not None:
+        resources_query = resources_query.filter(models.Resource.type == resource_type)
+    if min_capacity is not None:
+        resources_query = resources_query.filter(models.Resource.capacity >= min_capacity)
+    resources = resources_query.order_by(models.Resource.id).all()
+    if not resources:
+        return []
+
+    # Занятые интервалы всех подходящих ресурсов за период, уже отсортированные для sweep-line
+    busy = defaultdict(list)
+    rows = db.query(
+        models.Booking.resource_id,
+        models.Booking.date,
+        models.Booking.start_time,
+        models.Booking.end_time
+    ).filter(
+        models.Booking.resource_id.in_(resources_query.with_entities(models.Resource.id).scalar_subquery()),
+        models.Booking.date >= date_from,
+        models.Booking.date <= date_to,
+        models.Booking.start_time < day_end,
+        models.Booking.end_time > day_start
+    ).order_by(
+        models.Booking.resource_id,
+        models.Booking.date,
+        models.Booking.start_time
+    )
+    for resource_id, booking_date, start_time, end_time in rows:
+        busy[(resource_id, booking_date)].append((start_time, end_time))
+
+    dates = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    availability = []
+    for resource in resources:
+        for day in dates:
+            free_slots = find_free_slots(busy.get((resource.id, day), []), day_start, day_end, min_duration)
+            if free_slots:
+                availability.append({
+                    "resource": resource,
+                    "date": day,
+                    "free_slots": [{"start_time": start, "end_time": end} for start, end in free_slots]
+                })
+    return availability
+
+
+# Битовые карты занятости ресурсов по дням периода
+def get_occupancy_calendar(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    day_start: time,
+    day_end: time,
+    granularity: int,
+    resource_ids: Optional[List[int]] = None,
+    resource_type: Optional[str] = None
+) -> dict:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        date_from: Начало периода (включительно)
+        date_to: Конец периода (включительно)
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+        granularity: Длина слота в минутах
+        resource_ids: ID ресурсов (по умолчанию все)
+        resource_type: Тип ресурса
+
+    Результаты:
+        Словарь с полями схемы OccupancyCalendar; в resources только существующие
+        ресурсы. Бронирования всех ресурсов читаются одним запросом по диапазону.
+    """
+    resources_query = db.query(models.Resource.id)
+    if resource_ids:
+        resources_query = resources_query.filter(models.Resource.id.in_(resource_ids))
+    if resource_type is not None:
+        resources_query = resources_query.filter(models.Resource.type == resource_type)
+    found_ids = [row[0] for row in resources_query.order_by(models.Resource.id)]
+
+    slots = slot_count(day_start, day_end, granularity)
+    days = (date_to - date_from).days + 1
+    calendar = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "day_start": day_start,
+        "day_end": day_end,
+        "granularity": granularity,
+        "slots": slots,
+        "resources": []
+    }
+    if not found_ids:
+        return calendar
+
+    intervals = defaultdict(list)
+    rows = db.query(
+        models.Booking.resource_id,
+        models.Booking.date,
+        models.Booking.start_time,
+        models.Booking.end_time
+    ).filter(
+        models.Booking.resource_id.in_(found_ids),
+        models.Booking.date >= date_from,
+        models.Booking.date <= date_to,
+        models.Booking.start_time < day_end,
+        models.Booking.end_time > day_start
+    )
+    for resource_id, booking_date, start_time, end_time in rows:
+        intervals[(resource_id, (booking_date - date_from).days)].append((start_time, end_time))
+
+    # Свободный день у всех ресурсов кодируется одинаково
+    free_day = encode_mask(0, slots)
+    for resource_id in found_ids:
+        calendar["resources"].append({
+            "resource_id": resource_id,
+            "days": [
+                encode_mask(occupancy_mask(intervals[(resource_id, offset)], day_start, granularity, slots), slots)
+                if (resource_id, offset) in intervals else free_day
+                for offset in range(days)
+            ]
+        })
+    return calendar
+
+
+# Блок суточной загрузки ресурсов
+# Длительность бронирования в секундах
+def booking_duration_seconds(start_time: time, end_time: time) -> int:
+    start = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+    end = end_time.hour * 3600 + end_time.minute * 60 + end_time.second
+    return end - start
+
+# Изменение суточной загрузки ресурса на заданные величины (flush без commit)
+def adjust_daily_usage(db: Session, resource_id: int, usage_date: date, seconds: int, count: int) -> None:
+    db_usage = db.get(models.BookingDailyUsage, (resource_id, usage_date))
+    if db_usage is None:
+        # Вычитать не из чего: агрегат рассинхронизирован, его исправит rebuild_daily_usage
+        if count <= 0:
+            return
+        db.add(models.BookingDailyUsage(
+            resource_id=resource_id,
+            date=usage_date,
+            booked_seconds=seconds,
+            booking_count=count
+        ))
+    else:
+        db_usage.booked_seconds += seconds
+        db_usage.booking_count += count
+
+        # Пустые дни не храним
+        if db_usage.booking_count <= 0:
+            db.delete(db_usage)
+
+    # Сброс в БД сразу, чтобы следующие изменения того же дня видели актуальную строку
+    db.flush()
+
+# Учет бронирования в суточной загрузке
+def add_booking_to_daily_usage(db: Session, db_booking: models.Booking) -> None:
+    adjust_daily_usage(
+        db,
+        resource_id=db_booking.resource_id,
+        usage_date=db_booking.date,
+        seconds=booking_duration_seconds(db_booking.start_time, db_booking.end_time),
+        count=1
+    )
+
+# Исключение бронирования из суточной загрузки
+def remove_booking_from_daily_usage(db: Session, db_booking: models.Booking) -> None:
+    adjust_daily_usage(
+        db,
+        resource_id=db_booking.resource_id,
+        usage_date=db_booking.date,
+        seconds=-booking_duration_seconds(db_booking.start_time, db_booking.end_time),
+        count=-1
+    )
+
+# Изменения суточной загрузки от набора интервалов (resource_id, date, start_time, end_time):
+# (ресурс, дата) -> (секунды, количество)
+def daily_usage_deltas(intervals: Iterable[tuple], sign: int = 1) -> Dict[Tuple[int, date], Tuple[int, int]]:
+    deltas = defaultdict(lambda: (0, 0))
+    for resource_id, usage_date, start_time, end_time in intervals:
+        seconds, count = deltas[(resource_id, usage_date)]
+        deltas[(resource_id, usage_date)] = (
+            seconds + sign * booking_duration_seconds(start_time, end_time),
+            count + sign
+        )
+    return deltas
+
+# Применение изменений суточной загрузки сразу для многих дней (flush без commit)
+def apply_daily_usage_deltas(db: Session, deltas: Dict[Tuple[int, date], Tuple[int, int]]) -> None:
+    if not deltas:
+        return
+
+    rows = db.query(models.BookingDailyUsage).filter(
+        models.BookingDailyUsage.resource_id.in_({key[0] for key in deltas}),
+        models.BookingDailyUsage.date.in_({key[1] for key in deltas})
+    ).all()
+    existing = {(row.resource_id, row.date): row for row in rows}
+
+    for (resource_id, usage_date), (seconds, count) in deltas.items():
+        db_usage = existing.get((resource_id, usage_date))
+        if db_usage is None:
+            if count > 0:
+                db.add(models.BookingDailyUsage(
+                    resource_id=resource_id,
+                    date=usage_date,
+                    booked_seconds=seconds,
+                    booking_count=count
+                ))
+            continue
+
+        db_usage.booked_seconds += seconds
+        db_usage.booking_count += count
+        if db_usage.booking_count <= 0:
+            db.delete(db_usage)
+
+    db.flush()
+
+# Выражение длительности бронирования в секундах, вычисляемое в БД
+def booking_duration_seconds_expression(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        # julianday возвращает дни, время без даты трактуется как 2000-01-01
+        days = func.julianday(models.Booking.end_time) - func.julianday(models.Booking.start_time)
+        return cast(func.round(days * 86400), Integer)
+    return func.extract("epoch", models.Booking.end_time - models.Booking.start_time)
+
+# Полный пересчет суточной загрузки по таблице бронирований
+def rebuild_daily_usage(db: Session) -> int:
+    """
+    Результаты:
+        Количество записей суточной загрузки после пересчета
+    """
+    db.query(models.BookingDailyUsage).delete(synchronize_session=False)
+
+    aggregated = db.query(
+        models.Booking.resource_id,
+        models.Booking.date,
+        func.sum(booking_duration_seconds_expression(db)),
+        func.count(models.Booking.id)
+    ).group_by(
+        models.Booking.resource_id, models.Booking.date
+    )
+
+    db.execute(
+        insert(models.BookingDailyUsage).from_select(
+            ["resource_id", "date", "booked_seconds", "booking_count"],
+            aggregated
+        )
+    )
+    db.commit()
+    table_versions.bump(BOOKINGS)
+    return db.query(models.BookingDailyUsage).count()
+
+# Пересчет суточной загрузки, если она пуста при наличии бронирований
+# (например, после обновления существующей БД)
+def ensure_daily_usage(db: Session) -> None:
+    has_usage = db.query(models.BookingDailyUsage).first() is not None
+    has_bookings = db.query(models.Booking.id).first() is not None
+    if has_bookings and not has_usage:
+        rebuild_daily_usage(db)
+
+
+# Блок синхронизации
+# Заполнение журнала изменений для БД, созданной до его появления:
+# все существующие записи попадают в журнал как измененные
+def ensure_change_log(db: Session) -> None:
+    if db.query(models.ChangeLog.version).first() is not None:
+        return
+    for table in models.CHANGE_LOG_TABLES:
+        db.execute(
+            insert(models.ChangeLog).from_select(
+                ["entity", "entity_id", "deleted"],
+                select(literal(table), column("id"), literal(False)).select_from(models.Base.metadata.tables[table])
+            )
+        )
+    db.commit()
+
+# Изменения после версии клиента: текущие записи и ID удаленных
+def get_changes(db: Session, since: int = 0, limit: int = 1000) -> dict:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        since: Последняя версия, полученная клиентом (0 - все данные)
+        limit: Максимальное количество изменений в ответе
+
+    Результаты:
+        Словарь с полями схемы SyncChanges. Журнал и записи читаются в одной
+        транзакции, поэтому ответ согласован с версией version. Запись в SQLite
+        последовательна, поэтому изменения с меньшей версией не могут
+        появиться после выдачи большей.
+    """
+    entries = db.query(
+        models.ChangeLog.version,
+        models.ChangeLog.entity,
+        models.ChangeLog.entity_id,
+        models.ChangeLog.deleted
+    ).filter(
+        models.ChangeLog.version > since
+    ).order_by(models.ChangeLog.version).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    changed = {table: [] for table in models.CHANGE_LOG_TABLES}
+    deleted = {table: [] for table in models.CHANGE_LOG_TABLES}
+    for entry in entries:
+        (deleted if entry.deleted else changed)[entry.entity].append(entry.entity_id)
+
+    # Текущие значения измененных записей - по одному запросу на таблицу
+    result = {"version": entries[-1].version if entries else since, "has_more": has_more, "deleted": deleted}
+    for model in (models.Employee, models.Resource, models.Booking):
+        ids = changed[model.__tablename__]
+        result[model.__tablename__] = (
+            db.query(model).filter(model.id.in_(ids)).order_by(model.id).all() if ids else []
+        )
+    return result
+
+
 # Блок дополнительных запросов 
 # Получение всех бронирований на сегодня
-def get_bookings_today(db: Session) -> List[models.Booking]:
+def get_bookings_today(db: Session, limit: int = 100, cursor: Optional[str] = None) -> Page:
     today = date.today()
-    return db.query(models.Booking).filter(models.Booking.date == today).all()
+    query = query_booking_details(db).filter(models.Booking.date == today)
+    return keyset_page(query, BOOKING_ORDER, cursor=cursor, limit=limit)
 
 # Получение всех бронирований для конкретного:
 # - ресурса
-def get_bookings_by_resource(db: Session, resource_id: int) -> List[models.Booking]:
-    return db.query(models.Booking).filter(models.Booking.resource_id == resource_id).all()
+def get_bookings_by_resource(db: Session, resource_id: int, limit: int = 100, cursor: Optional[str] = None) -> Page:
+    query = query_booking_details(db).filter(models.Booking.resource_id == resource_id)
+    return keyset_page(query, BOOKING_ORDER, cursor=cursor, limit=limit)
 
 # - сотрудника
-def get_bookings_by_employee(db: Session, employee_id: int) -> List[models.Booking]:
-    return db.query(models.Booking).filter(models.Booking.employee_id == employee_id).all()
+def get_bookings_by_employee(db: Session, employee_id: int, limit: int = 100, cursor: Optional[str] = None) -> Page:
+    query = query_booking_details(db).filter(models.Booking.employee_id == employee_id)
+    return keyset_page(query, BOOKING_ORDER, cursor=cursor, limit=limit)
+
+# Поиск бронирований с фильтрацией на стороне БД
+# Построение запроса с фильтрами поиска
+def build_booking_search_query(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    resource_ids: Optional[Sequence[int]] = None,
+    employee_ids: Optional[Sequence[int]] = None,
+    resource_type: Optional[str] = None,
+    time_from: Optional[time] = None,
+    time_to: Optional[time] = None
+):
+    """
+    Аргументы:
+        db: Сессия базы данных
+        date_from: Начало диапазона дат (включительно)
+        date_to: Конец диапазона дат (включительно)
+        resource_ids: Список ID ресурсов
+        employee_ids: Список ID сотрудников
+        resource_type: Тип ресурса
+        time_from: Начало окна времени суток
+        time_to: Конец окна времени суток
+
+    Результаты:
+        Запрос бронирований с подгрузкой ресурса и сотрудника; все условия выполняются в SQL
+    """
+    query = query_booking_details(db)
 
-# Получение отчета по загрузке ресурсов за прошедший месяц месяц, с момента запроса
-def get_resource_usage_report(db: Session) -> List[dict]:
+    if date_from is not None:
+        query = query.filter(models.Booking.date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.Booking.date <= date_to)
+    if resource_ids:
+        query = query.filter(models.Booking.resource_id.in_(resource_ids))
+    if employee_ids:
+        query = query.filter(models.Booking.employee_id.in_(employee_ids))
 
-    one_month_ago = date.today() - timedelta(days=30)
+    # Фильтр по типу ресурса через подзапрос, чтобы не размножать строки соединением
+    if resource_type is not None:
+        resource_ids_of_type = db.query(models.Resource.id).filter(models.Resource.type == resource_type)
+        query = query.filter(models.Booking.resource_id.in_(resource_ids_of_type.scalar_subquery()))
 
-    # Получение всех ресурсов
-    resources = db.query(models.Resource).all()
+    # Окно времени суток: бронирование должно пересекаться с окном
+    if time_to is not None:
+        query = query.filter(models.Booking.start_time < time_to)
+    if time_from is not None:
+        query = query.filter(models.Booking.end_time > time_from)
 
-    # Формирование отчета
-    report = []
-    for resource in resources:
-        # Получение всех бронирований для этого ресурса за прошедший месяц месяц, с момента запроса
-        bookings = db.query(models.Booking).filter(
-            and_(
-                models.Booking.resource_id == resource.id,
-                models.Booking.date >= one_month_ago
+    return query
+
+# Поиск бронирований порционно
+def search_bookings(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    resource_ids: Optional[Sequence[int]] = None,
+    employee_ids: Optional[Sequence[int]] = None,
+    resource_type: Optional[str] = None,
+    time_from: Optional[time] = None,
+    time_to: Optional[time] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Page:
+    query = build_booking_search_query(
+        db,
+        date_from=date_from,
+        date_to=date_to,
+        resource_ids=resource_ids,
+        employee_ids=employee_ids,
+        resource_type=resource_type,
+        time_from=time_from,
+        time_to=time_to
+    )
+    return keyset_page(query, BOOKING_ORDER, cursor=cursor, limit=limit, skip=skip)
+
+# Измерения отчетов по загрузке: измерение -> поля строки отчета
+REPORT_DIMENSIONS = {
+    "resource": ("resource_id", "resource_name"),
+    "resource_type": ("resource_type",),
+    "employee": ("employee_id", "employee_name"),
+    "day": ("day",),
+    "week": ("week",),
+    "month": ("month",),
+}
+REPORT_PERIODS = ("day", "week", "month")
+
+# Начало периода (день, неделя с понедельника, месяц), содержащего дату, в SQL
+def period_start_expression(db: Session, period: str, date_column):
+    if period == "day":
+        return date_column
+    if db.get_bind().dialect.name == "sqlite":
+        modifiers = ("-6 days", "weekday 1") if period == "week" else ("start of month",)
+        return func.date(date_column, *modifiers, type_=Date)
+    return cast(func.date_trunc(period, date_column), Date)
+
+# Последний день периода, начинающегося с даты start, в SQL
+def period_end_expression(db: Session, period: str, start):
+    if period == "day":
+        return start
+    if db.get_bind().dialect.name == "sqlite":
+        modifiers = ("+6 days",) if period == "week" else ("+1 month", "-1 day")
+        return func.date(start, *modifiers, type_=Date)
+    step = "6 days" if period == "week" else "1 month - 1 day"
+    return cast(start + literal_column(f"interval '{step}'"), Date)
+
+# Количество дней между датами включительно в SQL
+def days_between_expression(db: Session, first, last):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.julianday(last) - func.julianday(first) + 1
+    return last - first + 1
+
+# Запрос отчета по загрузке из составных частей: источник, измерения, фильтры, емкость
+def build_usage_report_query(
+    db: Session,
+    group_by: Sequence[str],
+    date_from: date,
+    date_to: Optional[date] = None,
+    day_start: time = time(8, 0),
+    day_end: time = time(20, 0),
+    resource_ids: Optional[List[int]] = None,
+    employee_ids: Optional[List[int]] = None,
+    resource_type: Optional[str] = None,
+    top: Optional[int] = None,
+    order_by_total: bool = False
+):
+    """
+    Аргументы:
+        db: Сессия базы данных
+        group_by: Измерения из REPORT_DIMENSIONS
+        date_from: Начало периода (включительно)
+        date_to: Конец периода (включительно); без него загрузка не считается
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+        resource_ids: ID ресурсов
+        employee_ids: ID сотрудников
+        resource_type: Тип ресурса
+        top: Оставить N групп с наибольшим числом часов
+        order_by_total: Сортировать по убыванию часов (при top - всегда), иначе по измерениям
+
+    Результаты:
+        Запрос, строки которого содержат поля измерений, total_hours, booking_count
+        и utilisation. Без измерения сотрудника данные читаются из суточной загрузки,
+        иначе из бронирований. Загрузка - забронированное время к рабочему времени
+        ресурсов группы за дни периода группы в процентах; при группировке
+        по сотрудникам она не считается.
+    """
+    by_employee = "employee" in group_by or bool(employee_ids)
+    if by_employee:
+        source = models.Booking
+        seconds = func.sum(booking_duration_seconds_expression(db))
+        count = func.count(models.Booking.id)
+    else:
+        source = models.BookingDailyUsage
+        seconds = func.sum(models.BookingDailyUsage.booked_seconds)
+        count = func.sum(models.BookingDailyUsage.booking_count)
+
+    # Поля измерений
+    columns = []
+    for dimension in group_by:
+        if dimension == "resource":
+            columns += [models.Resource.id.label("resource_id"), models.Resource.name.label("resource_name")]
+        elif dimension == "resource_type":
+            columns.append(models.Resource.type.label("resource_type"))
+        elif dimension == "employee":
+            columns += [models.Employee.id.label("employee_id"), models.Employee.full_name.label("employee_name")]
+        else:
+            columns.append(period_start_expression(db, dimension, source.date).label(dimension))
+
+    # Фильтры ресурсов применяются и к фактам, и к подсчету емкости
+    resource_filters = []
+    if resource_ids:
+        resource_filters.append(models.Resource.id.in_(resource_ids))
+    if resource_type is not None:
+        resource_filters.append(models.Resource.type == resource_type)
+
+    query = select(*columns).select_from(source).join(models.Resource, models.Resource.id == source.resource_id)
+    if "employee" in group_by:
+        query = query.join(models.Employee, models.Employee.id == models.Booking.employee_id)
+    query = query.where(source.date >= date_from, *resource_filters)
+    if date_to is not None:
+        query = query.where(source.date <= date_to)
+    if employee_ids:
+        query = query.where(models.Booking.employee_id.in_(employee_ids))
+
+    # Емкость группы: ресурсы группы x дни периода группы x рабочие секунды дня
+    utilisation = literal(None)
+    if date_to is not None and "employee" not in group_by:
+        if "resource" in group_by:
+            units = literal(1)
+        else:
+            counted = aliased(models.Resource)
+            units_query = select(func.count(counted.id)).where(
+                *(condition for condition in (
+                    counted.id.in_(resource_ids) if resource_ids else None,
+                    counted.type == resource_type if resource_type is not None else None,
+                    counted.type == models.Resource.type if "resource_type" in group_by else None,
+                ) if condition is not None)
             )
-        ).all()
+            units = units_query.scalar_subquery()
 
-        # Вычисление общего времени
-        total_hours = 0.0
-        for booking in bookings:
-            # Преобразование time в datetime для вычисления разницы
-            start = datetime.combine(date.today(), booking.start_time)
-            end = datetime.combine(date.today(), booking.end_time)
-            duration = (end - start).total_seconds() / 3600  # Перевод в часы
-            total_hours += duration
-
-        # Добавление в отчет только ресурсов с бронированиями
-        if total_hours > 0:
-            report.append({
-                'resource_id': resource.id,
-                'resource_name': resource.name,
-                'total_hours': round(total_hours, 2)
-            })
+        periods = [dimension for dimension in REPORT_PERIODS if dimension in group_by]
+        first_days = [literal(date_from, Date)] + [period_start_expression(db, period, source.date) for period in periods]
+        last_days = [literal(date_to, Date)] + [
+            period_end_expression(db, period, period_start_expression(db, period, source.date)) for period in periods
+        ]
+        greatest, least = (func.max, func.min) if db.get_bind().dialect.name == "sqlite" else (func.greatest, func.least)
+        first = greatest(*first_days) if len(first_days) > 1 else first_days[0]
+        last = least(*last_days) if len(last_days) > 1 else last_days[0]
+        working_seconds = (minutes_of(day_end) - minutes_of(day_start)) * 60
+        capacity = units * days_between_expression(db, first, last) * working_seconds
+        utilisation = func.round(seconds * 100.0 / capacity, 1)
+
+    total_hours = func.round(seconds / 3600.0, 2)
+    query = query.add_columns(
+        total_hours.label("total_hours"),
+        count.label("booking_count"),
+        utilisation.label("utilisation")
+    ).group_by(*columns).having(count > 0)
 
-    # Сортировка по убыванию
-    report.sort(key=lambda x: x['total_hours'], reverse=True)
+    # Ключи группировки без названий (они однозначно определяются ID)
+    keys = [column for column in columns if column.name not in ("resource_name", "employee_name")]
+    if top is not None or order_by_total:
+        query = query.order_by(total_hours.desc(), *keys)
+    else:
+        query = query.order_by(*keys)
+    return query.limit(top) if top is not None else query
 
+# Отчет по загрузке с группировкой по произвольным измерениям
+def get_usage_report(db: Session, group_by: Sequence[str], date_from: date, date_to: date, **filters) -> List[dict]:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        group_by: Измерения из REPORT_DIMENSIONS
+        date_from: Начало периода (включительно)
+        date_to: Конец периода (включительно)
+        filters: Остальные параметры build_usage_report_query
+
+    Результаты:
+        Строки отчета (поля схемы UsageReportRow). Отчет строится одним запросом
+        и хранится в кэше до следующей записи бронирований, ресурсов или сотрудников.
+    """
+    query = build_usage_report_query(db, group_by, date_from, date_to, **filters)
+    params = {"group_by": list(group_by), "date_from": date_from, "date_to": date_to, **filters}
+    return cached_value(
+        "usage_report",
+        [BOOKINGS, RESOURCES, EMPLOYEES],
+        params,
+        lambda: [row._asdict() for row in db.execute(query)]
+    )
+
+# Получение отчета по загрузке ресурсов за период (по умолчанию за последние 30 дней)
+def get_resource_usage_report(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    resource_type: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[dict]:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        date_from: Начало периода (включительно), по умолчанию 30 дней назад
+        date_to: Конец периода (включительно), по умолчанию без ограничения
+        resource_type: Тип ресурса
+        limit: Максимальное количество ресурсов в отчете
+
+    Результаты:
+        Ресурсы с бронированиями и суммарными часами, по убыванию часов.
+        Частный случай отчета build_usage_report_query по измерению resource;
+        хранится в кэше до следующей записи бронирований или ресурсов.
+    """
+    if date_from is None:
+        date_from = date.today() - timedelta(days=30)
+
+    query = build_usage_report_query(
+        db,
+        ["resource"],
+        date_from,
+        date_to,
+        resource_type=resource_type,
+        top=limit,
+        order_by_total=True
+    )
+
+    # Результат кэшируется до изменения бронирований или ресурсов
+    params = {"date_from": date_from, "date_to": date_to, "resource_type": resource_type, "limit": limit}
+    return cached_value(
+        "resource_usage_report",
+        [BOOKINGS, RESOURCES],
+        params,
+        lambda: [
+            {"resource_id": row.resource_id, "resource_name": row.resource_name, "total_hours": row.total_hours}
+            for row in db.execute(query)
+        ]
+    )
+
+# Время в минутах от полуночи в SQL
+def minutes_of_day_expression(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        days = func.julianday(column) - func.julianday("00:00")
+        return cast(func.round(days * 1440), Integer)
+    return cast(func.extract("hour", column) * 60 + func.extract("minute", column), Integer)
+
+# День недели (0 - понедельник) в SQL
+def weekday_expression(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        return (cast(func.strftime("%w", column), Integer) + 6) % 7
+    return (cast(func.extract("dow", column), Integer) + 6) % 7
+
+# Размер порции строк при расчете тепловой карты
+HEATMAP_BATCH_SIZE = 50000
+
+# Тепловая карта загрузки ресурсов по типам: день недели x час рабочего дня
+def get_heatmap_report(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    day_start: time,
+    day_end: time,
+    resource_type: Optional[str] = None
+) -> dict:
+    """
+    Аргументы:
+        db: Сессия базы данных
+        date_from: Начало периода (включительно)
+        date_to: Конец периода (включительно)
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+        resource_type: Тип ресурса (по умолчанию все типы)
+
+    Результаты:
+        Словарь с полями схемы HeatmapReport. Загрузка ячейки - доля занятого
+        времени ресурсов типа в этот час от рабочего времени всех ресурсов типа
+        во все такие дни недели периода. Бронирования читаются одним запросом
+        (ID ресурса, день недели, начало и окончание в минутах) порциями
+        и накапливаются векторно (heatmap.HeatmapAccumulator).
+    """
+    resources_query = db.query(models.Resource.id, models.Resource.type)
+    if resource_type is not None:
+        resources_query = resources_query.filter(models.Resource.type == resource_type)
+    resource_types = dict(resources_query.all())
+
+    types = sorted(set(resource_types.values()))
+    type_index = {name: index for index, name in enumerate(types)}
+    work_start, work_end = minutes_of(day_start), minutes_of(day_end)
+    hours = [hour for hour, minutes in enumerate(working_minutes_by_hour(work_start, work_end)) if minutes]
+    report = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "day_start": day_start,
+        "day_end": day_end,
+        "hours": hours,
+        "heatmaps": []
+    }
+    if not types:
+        return report
+
+    def load():
+        accumulator = HeatmapAccumulator(
+            {resource_id: type_index[name] for resource_id, name in resource_types.items()},
+            work_start,
+            work_end
+        )
+        statement = select(
+            models.Booking.resource_id,
+            weekday_expression(db, models.Booking.date),
+            minutes_of_day_expression(db, models.Booking.start_time),
+            minutes_of_day_expression(db, models.Booking.end_time)
+        ).where(
+            models.Booking.date >= date_from,
+            models.Booking.date <= date_to,
+            models.Booking.start_time < day_end,
+            models.Booking.end_time > day_start
+        )
+        if resource_type is not None:
+            statement = statement.where(models.Booking.resource_id.in_(resource_types))
+
+        # Строки читаются через соединение сессии, без обработки ORM
+        result = db.connection().execute(statement.execution_options(stream_results=True))
+        for rows in result.partitions(HEATMAP_BATCH_SIZE):
+            accumulator.add_rows(rows)
+        booked = accumulator.booked_minutes()
+
+        # Количество дат периода по дням недели и рабочих минут по часам
+        weekday_dates = [0] * DAYS_PER_WEEK
+        for offset in range((date_to - date_from).days + 1):
+            weekday_dates[(date_from + timedelta(days=offset)).weekday()] += 1
+        hour_minutes = working_minutes_by_hour(work_start, work_end)
+        resource_counts = defaultdict(int)
+        for name in resource_types.values():
+            resource_counts[name] += 1
+
+        heatmaps = []
+        for name in types:
+            group = type_index[name]
+            heatmaps.append({
+                "resource_type": name,
+                "resources": resource_counts[name],
+                "utilisation": [
+                    [
+                        utilisation_percent(
+                            booked[group][weekday][hour],
+                            resource_counts[name] * weekday_dates[weekday] * hour_minutes[hour]
+                        )
+                        for hour in hours
+                    ]
+                    for weekday in range(DAYS_PER_WEEK)
+                ]
+            })
+        return heatmaps
+
+    # Результат кэшируется до изменения бронирований или ресурсов
+    params = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "day_start": day_start,
+        "day_end": day_end,
+        "resource_type": resource_type
+    }
+    report["heatmaps"] = cached_value("heatmap_report", [BOOKINGS, RESOURCES], params, load)
     return report
+
+# Блок выгрузки бронирований
+# Размер порции строк, читаемых из курсора БД за один раз
+EXPORT_BATCH_SIZE = 1000
+
+# Запрос бронирований для выгрузки
+def build_booking_export_statement(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    resource_ids: Optional[Sequence[int]] = None,
+    employee_ids: Optional[Sequence[int]] = None,
+    resource_type: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """
+    Аргументы:
+        date_from: Начало диапазона дат (включительно)
+        date_to: Конец диапазона дат (включительно)
+        resource_ids: Список ID ресурсов
+        employee_ids: Список ID сотрудников
+        resource_type: Тип ресурса
+        batch_size: Количество строк, получаемых из курсора за раз
+
+    Результаты:
+        SELECT полей EXPORT_COLUMNS в порядке даты и времени начала.
+        Выбираются только столбцы (без объектов ORM), а курсор читается порциями
+        (yield_per), поэтому память не зависит от объема выгрузки.
+    """
+    booking = models.Booking
+    statement = select(
+        booking.id,
+        booking.date,
+        booking.start_time,
+        booking.end_time,
+        booking.resource_id,
+        models.Resource.name,
+        models.Resource.type,
+        booking.employee_id,
+        models.Employee.full_name,
+        models.Employee.email,
+        booking.series_id
+    ).join(
+        models.Resource, models.Resource.id == booking.resource_id
+    ).join(
+        models.Employee, models.Employee.id == booking.employee_id
+    )
+
+    if date_from is not None:
+        statement = statement.where(booking.date >= date_from)
+    if date_to is not None:
+        statement = statement.where(booking.date <= date_to)
+    if resource_ids:
+        statement = statement.where(booking.resource_id.in_(resource_ids))
+    if employee_ids:
+        statement = statement.where(booking.employee_id.in_(employee_ids))
+    if resource_type is not None:
+        statement = statement.where(models.Resource.type == resource_type)
+
+    return statement.order_by(*BOOKING_ORDER).execution_options(yield_per=batch_size)
+
+# Потоковое чтение бронирований для выгрузки порциями строк
+def iter_booking_export_rows(db: Session, **filters) -> Iterable[Sequence[tuple]]:
+    for partition in db.execute(build_booking_export_statement(**filters)).partitions():
+        yield partition
+
+# То же для асинхронной сессии: строки читаются потоком без буферизации результата
+async def stream_booking_export_rows(db: AsyncSession, **filters) -> AsyncIterator[Sequence[tuple]]:
+    result = await db.stream(build_booking_export_statement(**filters))
+    async for partition in result.partitions():
+        yield partition
+
+# Названия столбцов выгрузки в порядке полей строк iter_booking_export_rows
+EXPORT_COLUMNS = (
+    "id",
+    "date",
+    "start_time",
+    "end_time",
+    "resource_id",
+    "resource_name",
+    "resource_type",
+    "employee_id",
+    "employee_full_name",
+    "employee_email",
+    "series_id",
+)
@@ -1,8 +1,16 @@
 # backend/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import random
+import time
 
 # Путь внутри контейнера
 SQLALCHEMY_DATABASE_URL = os.getenv(
@@ -10,17 +18,234 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
     "sqlite:////app/backend/booking_system.db" 
 )
 
+# Асинхронный стек БД для эндпоинтов (DB_ASYNC=1): драйвер aiosqlite вместо
+# pysqlite, запросы не занимают потоки пула на время обращения к БД
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+
+# Профиль хранения SQLite: PRAGMA, применяемые к каждому новому соединению.
+# WAL позволяет читателям работать параллельно с записью, synchronous=NORMAL
+# в режиме WAL безопасен для целостности и не делает fsync на каждый commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Отрицательное значение - размер в КиБ (64 МиБ)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Ожидание блокировки другим соединением, мс
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+}
+
+# Пулы соединений: постоянные соединения движка записи и движка только для чтения,
+# дополнительные соединения сверх пула и ожидание свободного соединения, секунды
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+# Управление транзакциями SQLite берет на себя SQLAlchemy: драйвер
+# не открывает транзакции сам, а BEGIN выдается с режимом из execution option
+# "sqlite_begin" (DEFERRED по умолчанию, IMMEDIATE для записи бронирований).
+# Соединения движка для чтения переводятся в query_only: запись через них невозможна.
+def configure_sqlite_engine(sync_engine, read_only: bool = False) -> None:
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin_sqlite_transaction(connection):
+        mode = connection.get_execution_options().get("sqlite_begin", "DEFERRED")
+        connection.exec_driver_sql(f"BEGIN {mode}")
+
+
+# Движок для записи и чтения-перед-записью
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
 )
+configure_sqlite_engine(engine)
+
+# Движок только для чтения (GET эндпоинты и отчеты) с отдельным пулом,
+# чтобы долгие чтения не занимали соединения пути записи
+read_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
+)
+configure_sqlite_engine(read_engine, read_only=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+# Асинхронные движки создаются только при включенном стеке,
+# чтобы синхронный режим не требовал установленного aiosqlite
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if DB_ASYNC:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT
+    )
+    configure_sqlite_engine(async_engine.sync_engine)
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL, pool_size=DB_READ_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT
+    )
+    configure_sqlite_engine(async_read_engine.sync_engine, read_only=True)
+    # Объекты не сбрасываются после commit: их сериализация идет вне сессии
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False
+    )
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class Database:
+    """
+    Сессия БД для async-эндпоинтов. Функции crud выполняются на синхронной
+    сессии: в синхронном стеке - в пуле потоков, в асинхронном - через
+    AsyncSession.run_sync, где каждый запрос к БД ожидается в цикле событий.
+
+    Пример:
+        db_booking = await db.run(crud.get_booking, booking_id=booking_id)
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, operation, *args, **kwargs):
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(operation, *args, **kwargs)
+        return await run_in_threadpool(operation, self.session, *args, **kwargs)
+
+
+# Сессия выбранного стека (DB_ASYNC) из фабрик синхронных и асинхронных сессий
+@asynccontextmanager
+async def _open_database(session_factory, async_session_factory):
+    if DB_ASYNC:
+        async with async_session_factory() as session:
+            yield Database(session)
+    else:
+        db = session_factory()
+        try:
+            yield Database(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+# Зависимость эндпоинтов, изменяющих данные
+async def get_database():
+    async with _open_database(SessionLocal, AsyncSessionLocal) as db:
+        yield db
+
+
+# Зависимость GET эндпоинтов и отчетов: сессия движка только для чтения
+async def get_read_db():
+    async with _open_database(ReadSessionLocal, AsyncReadSessionLocal) as db:
+        yield db
+
+
+# Параметры повторов при занятой БД
+LOCK_RETRY_ATTEMPTS = int(os.getenv("DB_LOCK_RETRY_ATTEMPTS", "5"))
+LOCK_RETRY_BASE_DELAY = float(os.getenv("DB_LOCK_RETRY_BASE_DELAY", "0.05"))
+
+
+# Пауза между повторами: в асинхронном стеке ожидается в цикле событий,
+# чтобы не блокировать остальные запросы
+def _sleep(delay: float) -> None:
+    if in_greenlet():
+        await_only(asyncio.sleep(delay))
+    else:
+        time.sleep(delay)
+
+
+class DatabaseBusyError(Exception):
+    """БД осталась заблокирована другим процессом после всех повторов."""
+
+
+# Начало пишущей транзакции с немедленной блокировкой на запись.
+# Читающая транзакция сессии, открытая ранее, завершается.
+def begin_write_transaction(db) -> None:
+    if db.in_transaction():
+        db.commit()
+    db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+
+# Выполнение операции с повторами при ошибке "database is locked".
+# Задержка растет экспоненциально, со случайной добавкой против синхронных повторов.
+def run_with_lock_retry(db, operation, attempts: int = None, base_delay: float = None):
+    attempts = attempts if attempts is not None else LOCK_RETRY_ATTEMPTS
+    base_delay = base_delay if base_delay is not None else LOCK_RETRY_BASE_DELAY
+
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except OperationalError as error:
+            db.rollback()
+            if "database is locked" not in str(error.orig):
+                raise
+            if attempt == attempts - 1:
+                raise DatabaseBusyError("База данных занята, повторите запрос позже") from error
+            _sleep(base_delay * (2 ** attempt) * (1 + random.random()))
+
+
+class QueryCounter:
+    """
+    Контекстный менеджер для подсчета SQL запросов, выполненных через движок.
+
+    Пример:
+        with QueryCounter() as counter:
+            client.get("/bookings/")
+        print(counter.count, counter.statements)
+    """
+
+    def __init__(self, bind=None):
+        # По умолчанию учитываются запросы движков записи и чтения
+        self.binds = [bind] if bind is not None else [engine, read_engine]
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        for bind in self.binds:
+            event.listen(bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for bind in self.binds:
+            event.remove(bind, "before_cursor_execute", self._on_execute)
+        return False
@@ -0,0 +1,47 @@
+# Модуль форматирования потоковой выгрузки бронирований.
+# Преобразует порции строк из БД в фрагменты NDJSON или CSV,
+# которые отдаются клиенту по мере чтения, без накопления всего ответа.
+
+from datetime import date, time
+from typing import Sequence
+import csv
+import io
+import json
+
+# Поддерживаемые форматы: формат -> (MIME-тип, расширение файла)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+# Приведение даты и времени к строкам ISO 8601
+def _serialize_value(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+# Запись строк в CSV
+def _csv_text(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+# Начало выгрузки: строка заголовков для CSV, для NDJSON пусто
+def export_header(export_format: str, columns: Sequence[str]) -> str:
+    if export_format == "csv":
+        return _csv_text([columns])
+    return ""
+
+
+# Фрагмент выгрузки из порции строк
+def export_rows(export_format: str, columns: Sequence[str], rows: Sequence[tuple]) -> str:
+    if export_format == "csv":
+        return _csv_text([_serialize_value(value) for value in row] for row in rows)
+    # NDJSON: один JSON объект на строку
+    return "".join(
+        json.dumps(dict(zip(columns, map(_serialize_value, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
@@ -0,0 +1,237 @@
+# Скрипт генерации синтетических данных для нагрузочного тестирования.
+# Пишет сотрудников, ресурсы и бронирования напрямую в БД пакетными INSERT
+# (executemany) в одной транзакции. Бронирования ресурса за день не пересекаются
+# по построению, поэтому на время загрузки триггеры защиты от пересечений
+# и индексы бронирований снимаются и создаются заново в конце.
+# Одинаковые параметры и seed дают одинаковые данные.
+#
+# Запуск: python -m backend.generate_dataset --employees 2000 --resources 300 \
+#             --bookings 1000000 --date-from 2025-01-01 --days 365 --seed 42
+# Работающий сервер нужно перезапустить: его кэши не знают о загруженных данных.
+
+import argparse
+import random
+import sys
+import time as timer
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend import crud, models
+from backend.database import Base, SessionLocal, engine
+
+# Рабочий день и сетка бронирований: 08:00-20:00 с шагом 15 минут
+DAY_START_MINUTES = 8 * 60
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 48
+# Длительности бронирований в слотах (30, 60, 90, 120 минут) и их веса
+DURATION_SLOTS = (2, 4, 6, 8)
+DURATION_WEIGHTS = (4, 3, 2, 1)
+MAX_BOOKINGS_PER_DAY = SLOTS_PER_DAY // min(DURATION_SLOTS)
+
+# Типы ресурсов по умолчанию: тип -> (вес, варианты вместимости)
+RESOURCE_TYPES = {
+    "комната": (6, (4, 6, 8, 12, 20)),
+    "рабочее место": (3, (1,)),
+    "проектор": (1, (None,)),
+}
+
+DEFAULT_BATCH_SIZE = 50000
+
+
+# Разбор весов типов ресурсов вида "комната=6,проектор=1"
+def parse_type_weights(value: str) -> Dict[str, Tuple[int, Sequence[Optional[int]]]]:
+    types = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        capacities = RESOURCE_TYPES.get(name, (0, (None,)))[1]
+        types[name] = (int(weight or 1), capacities)
+    return types
+
+
+# Значения в формате хранения столбца (как их записывает SQLAlchemy)
+def column_processor(column):
+    processor = column.type.dialect_impl(engine.dialect).bind_processor(engine.dialect)
+    return processor or (lambda value: value)
+
+
+# Интервалы бронирований одного ресурса за день в слотах: (начало, конец)
+def day_intervals(rng: random.Random, count: int) -> List[Tuple[int, int]]:
+    durations = rng.choices(DURATION_SLOTS, DURATION_WEIGHTS, k=count)
+    if sum(durations) > SLOTS_PER_DAY:
+        durations = [min(DURATION_SLOTS)] * count
+
+    # Свободное время распределяется между бронированиями случайными промежутками
+    slack = SLOTS_PER_DAY - sum(durations)
+    offsets = sorted(rng.randrange(slack + 1) for _ in range(count))
+
+    intervals = []
+    occupied = 0
+    for offset, duration in zip(offsets, durations):
+        start = offset + occupied
+        intervals.append((start, start + duration))
+        occupied += duration
+    return intervals
+
+
+# Удаление всех данных системы
+def reset_data(connection) -> None:
+    for table in (models.BookingDailyUsage, models.Booking, models.BookingSeries, models.Resource, models.Employee):
+        connection.exec_driver_sql(f"DELETE FROM {table.__tablename__}")
+
+
+# Следующий свободный ID таблицы
+def next_id(connection, table) -> int:
+    return (connection.exec_driver_sql(f"SELECT max(id) FROM {table.__tablename__}").scalar() or 0) + 1
+
+
+def generate(
+    employees: int,
+    resources: int,
+    bookings: int,
+    date_from: date,
+    days: int,
+    seed: int,
+    resource_types: Dict[str, Tuple[int, Sequence[Optional[int]]]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    reset: bool = False
+) -> None:
+    resource_days = resources * days
+    if bookings and not resource_days:
+        raise ValueError("Для бронирований нужны ресурсы и хотя бы один день")
+    per_day, extra = divmod(bookings, resource_days) if resource_days else (0, 0)
+    if per_day + (1 if extra else 0) > MAX_BOOKINGS_PER_DAY:
+        raise ValueError(
+            f"Не более {MAX_BOOKINGS_PER_DAY} бронирований на ресурс в день: "
+            f"увеличьте число ресурсов или дней"
+        )
+
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    booking_table = models.Booking.__table__
+
+    # Время и дата в формате хранения считаются один раз
+    time_value = column_processor(booking_table.c.start_time)
+    date_value = column_processor(booking_table.c.date)
+    slot_times = [
+        time_value(time(*divmod(DAY_START_MINUTES + slot * SLOT_MINUTES, 60)))
+        for slot in range(SLOTS_PER_DAY + 1)
+    ]
+    day_values = [date_value(date_from + timedelta(days=offset)) for offset in range(days)]
+
+    started = timer.perf_counter()
+    models.remove_booking_overlap_guard(engine)
+    try:
+        with engine.begin() as connection:
+            for index in booking_table.indexes:
+                index.drop(connection, checkfirst=True)
+            if reset:
+                reset_data(connection)
+
+            # Сотрудники
+            first_employee = next_id(connection, models.Employee)
+            connection.exec_driver_sql(
+                "INSERT INTO employees (id, full_name, email) VALUES (?, ?, ?)",
+                [
+                    (employee_id, f"Сотрудник {employee_id}", f"user{employee_id}@company.com")
+                    for employee_id in range(first_employee, first_employee + employees)
+                ]
+            )
+
+            # Ресурсы с распределением типов и вместимости
+            first_resource = next_id(connection, models.Resource)
+            type_names = list(resource_types)
+            type_weights = [resource_types[name][0] for name in type_names]
+            resource_rows = []
+            for resource_id in range(first_resource, first_resource + resources):
+                resource_type = rng.choices(type_names, type_weights)[0]
+                capacity = rng.choice(resource_types[resource_type][1])
+                resource_rows.append((resource_id, f"{resource_type.capitalize()} №{resource_id}", resource_type, capacity))
+            connection.exec_driver_sql(
+                "INSERT INTO resources (id, name, type, capacity) VALUES (?, ?, ?, ?)",
+                resource_rows
+            )
+            print(f"[OK] Сотрудников: {employees}, ресурсов: {resources}")
+
+            # Бронирования пакетами по batch_size строк
+            insert_booking = (
+                "INSERT INTO bookings (resource_id, employee_id, date, start_time, end_time) "
+                "VALUES (?, ?, ?, ?, ?)"
+            )
+            batch = []
+            written = 0
+            resource_day = 0
+            for day_value in day_values:
+                for resource_id in range(first_resource, first_resource + resources):
+                    count = per_day + (1 if resource_day < extra else 0)
+                    resource_day += 1
+                    for start, end in day_intervals(rng, count):
+                        employee_id = first_employee + rng.randrange(employees)
+                        batch.append((resource_id, employee_id, day_value, slot_times[start], slot_times[end]))
+                    if len(batch) >= batch_size:
+                        connection.exec_driver_sql(insert_booking, batch)
+                        written += len(batch)
+                        batch = []
+            if batch:
+                connection.exec_driver_sql(insert_booking, batch)
+                written += len(batch)
+            print(f"[OK] Бронирований: {written} ({timer.perf_counter() - started:.1f} с)")
+
+            for index in booking_table.indexes:
+                index.create(connection)
+            print(f"[OK] Индексы созданы ({timer.perf_counter() - started:.1f} с)")
+    finally:
+        for index in booking_table.indexes:
+            index.create(engine, checkfirst=True)
+        models.install_booking_overlap_guard(engine)
+
+    # Суточная загрузка пересчитывается одним INSERT ... SELECT
+    with SessionLocal() as db:
+        crud.rebuild_daily_usage(db)
+    print(f"[OK] Суточная загрузка пересчитана ({timer.perf_counter() - started:.1f} с)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных системы бронирования")
+    parser.add_argument("--employees", type=int, default=1000, help="Количество сотрудников")
+    parser.add_argument("--resources", type=int, default=100, help="Количество ресурсов")
+    parser.add_argument("--bookings", type=int, default=100000, help="Количество бронирований")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=date.today(), help="Первая дата (ГГГГ-ММ-ДД)")
+    parser.add_argument("--days", type=int, default=90, help="Количество дней")
+    parser.add_argument("--seed", type=int, default=42, help="Начальное значение генератора случайных чисел")
+    parser.add_argument(
+        "--types",
+        type=parse_type_weights,
+        default=RESOURCE_TYPES,
+        help="Веса типов ресурсов, например \"комната=6,рабочее место=3,проектор=1\""
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Строк в одном INSERT")
+    parser.add_argument("--reset", action="store_true", help="Удалить существующие данные")
+    args = parser.parse_args(argv)
+
+    if args.bookings and args.employees <= 0:
+        parser.error("Для бронирований нужен хотя бы один сотрудник")
+
+    print("=" * 60)
+    print("Генерация синтетических данных")
+    print("=" * 60)
+    try:
+        generate(
+            employees=args.employees,
+            resources=args.resources,
+            bookings=args.bookings,
+            date_from=args.date_from,
+            days=args.days,
+            seed=args.seed,
+            resource_types=args.types,
+            batch_size=args.batch_size,
+            reset=args.reset
+        )
+    except ValueError as error:
+        print(f"[ERROR] {error}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# Модуль расчета тепловой карты загрузки ресурсов (день недели x час).
+# Бронирования накапливаются в разностных массивах по минутам суток:
+# в минуту начала добавляется +1, в минуту окончания -1, после чего
+# накопленная сумма дает число занятых ресурсов в каждую минуту.
+# С NumPy накопление выполняется для целых порций строк через bincount,
+# без NumPy - тем же алгоритмом в цикле Python.
+
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MINUTES_PER_DAY = 24 * 60
+DAYS_PER_WEEK = 7
+
+
+class HeatmapAccumulator:
+    """
+    Занятые минуты по группам ресурсов, дням недели и минутам суток.
+
+    Аргументы:
+        resource_groups: Группа (номер типа) каждого ресурса
+        work_start: Начало рабочего дня в минутах от полуночи
+        work_end: Окончание рабочего дня в минутах от полуночи
+
+    Строки передаются как (ID ресурса, день недели 0-6 с понедельника, начало, окончание),
+    время в минутах от полуночи; интервалы обрезаются рабочими часами.
+    """
+
+    def __init__(self, resource_groups: Dict[int, int], work_start: int, work_end: int):
+        self.resource_groups = resource_groups
+        self.groups = max(resource_groups.values(), default=-1) + 1
+        self.work_start = work_start
+        self.work_end = work_end
+        # Разностный массив на группу и день недели, с лишней минутой для окончаний в 24:00
+        self._size = self.groups * DAYS_PER_WEEK * (MINUTES_PER_DAY + 1)
+        if numpy is not None:
+            self._diff = numpy.zeros(self._size, dtype=numpy.int64)
+            # Таблица ID ресурса -> группа (-1 для ресурсов вне отчета)
+            self._group_of = numpy.full(max(resource_groups, default=0) + 1, -1, dtype=numpy.int64)
+            self._group_of[list(resource_groups)] = list(resource_groups.values())
+        else:
+            self._diff = [0] * self._size
+
+    def add_rows(self, rows: Sequence[Tuple[int, int, int, int]]) -> None:
+        if not rows:
+            return
+        if numpy is None:
+            self._add_rows_python(rows)
+            return
+
+        # fromiter по плоской последовательности в десятки раз быстрее asarray для строк SQLAlchemy
+        values = numpy.fromiter(chain.from_iterable(rows), dtype=numpy.int64, count=len(rows) * 4)
+        resource_id, weekday, start, end = values.reshape(-1, 4).T
+        known = resource_id < len(self._group_of)
+        group = numpy.where(known, self._group_of[numpy.where(known, resource_id, 0)], -1)
+        start = numpy.maximum(start, self.work_start)
+        end = numpy.minimum(end, self.work_end)
+        keep = (end > start) & (group >= 0)
+        base = (group[keep] * DAYS_PER_WEEK + weekday[keep]) * (MINUTES_PER_DAY + 1)
+        self._diff += numpy.bincount(base + start[keep], minlength=self._size)
+        self._diff -= numpy.bincount(base + end[keep], minlength=self._size)
+
+    def _add_rows_python(self, rows) -> None:
+        for resource_id, weekday, start, end in rows:
+            group = self.resource_groups.get(resource_id)
+            start = max(start, self.work_start)
+            end = min(end, self.work_end)
+            if group is not None and end > start:
+                base = (group * DAYS_PER_WEEK + weekday) * (MINUTES_PER_DAY + 1)
+                self._diff[base + start] += 1
+                self._diff[base + end] -= 1
+
+    # Занятые минуты ресурсов группы по дням недели и часам: [группа][день][час]
+    def booked_minutes(self) -> List[List[List[int]]]:
+        if numpy is not None:
+            occupancy = self._diff.reshape(self.groups, DAYS_PER_WEEK, MINUTES_PER_DAY + 1).cumsum(axis=2)
+            return occupancy[:, :, :MINUTES_PER_DAY].reshape(self.groups, DAYS_PER_WEEK, 24, 60).sum(axis=3).tolist()
+
+        result = []
+        for group in range(self.groups):
+            days = []
+            for weekday in range(DAYS_PER_WEEK):
+                base = (group * DAYS_PER_WEEK + weekday) * (MINUTES_PER_DAY + 1)
+                hours = [0] * 24
+                busy = 0
+                for minute in range(MINUTES_PER_DAY):
+                    busy += self._diff[base + minute]
+                    hours[minute // 60] += busy
+                days.append(hours)
+            result.append(days)
+        return result
+
+
+# Рабочие минуты каждого часа суток
+def working_minutes_by_hour(work_start: int, work_end: int) -> List[int]:
+    return [max(0, min(work_end, (hour + 1) * 60) - max(work_start, hour * 60)) for hour in range(24)]
+
+
+# Загрузка в процентах: занятые минуты к доступным; None, если доступного времени нет
+def utilisation_percent(booked: int, available: int) -> Optional[float]:
+    if available <= 0:
+        return None
+    return round(booked * 100.0 / available, 1)
@@ -0,0 +1,135 @@
+# Модуль с индексом интервалов бронирований в памяти процесса.
+# Хранит отсортированные интервалы по каждой паре (ресурс, дата) и отвечает
+# на вопрос о пересечении за O(log n) без обращения к БД.
+# Включается переменной окружения BOOKING_INTERVAL_INDEX=1. Сбрасывается
+# при записи бронирований в этом процессе и целиком - по сообщениям
+# об изменениях в других воркерах (при общем хранилище кэша CACHE_BACKEND=redis).
+# Окончательную проверку пересечений всегда выполняет триггер БД.
+
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date, time
+from threading import Lock
+from typing import Callable, List, Optional, Tuple
+import os
+
+from backend.cache import BOOKINGS, RESOURCES, table_versions
+
+# Интервал: (время начала, время окончания, ID бронирования)
+Interval = Tuple[time, time, int]
+
+
+class DayIntervals:
+    """
+    Атрибуты:
+        starts: Времена начала, по возрастанию
+        ends: Времена окончания в том же порядке
+        ids: ID бронирований в том же порядке
+        max_ends: Максимальное время окончания среди интервалов [0..i]
+    """
+
+    def __init__(self, intervals: List[Interval]):
+        intervals = sorted(intervals)
+        self.starts = [interval[0] for interval in intervals]
+        self.ends = [interval[1] for interval in intervals]
+        self.ids = [interval[2] for interval in intervals]
+
+        self.max_ends = []
+        current_max = None
+        for end in self.ends:
+            current_max = end if current_max is None or end > current_max else current_max
+            self.max_ends.append(current_max)
+
+    def overlaps(self, start_time: time, end_time: time, exclude_id: Optional[int] = None) -> bool:
+        # Кандидаты - интервалы, начинающиеся раньше окончания запрошенного
+        position = bisect_left(self.starts, end_time) - 1
+
+        # Идем назад, пока среди оставшихся интервалов может быть пересечение
+        while position >= 0 and self.max_ends[position] > start_time:
+            if self.ends[position] > start_time and self.ids[position] != exclude_id:
+                return True
+            position -= 1
+        return False
+
+
+class BookingIntervalIndex:
+    """
+    Кэш интервалов бронирований по парам (ресурс, дата) с вытеснением LRU.
+
+    Аргументы:
+        max_days: Максимальное число хранимых пар (ресурс, дата)
+    """
+
+    def __init__(self, max_days: int = 10000):
+        self.max_days = max_days
+        self._days = OrderedDict()
+        self._lock = Lock()
+        # Счетчик сбросов: загруженные данные не сохраняются, если за время загрузки был сброс
+        self._generation = 0
+
+    def overlaps(
+        self,
+        resource_id: int,
+        booking_date: date,
+        start_time: time,
+        end_time: time,
+        loader: Callable[[int, date], List[Interval]],
+        exclude_id: Optional[int] = None
+    ) -> bool:
+        """
+        Аргументы:
+            loader: Функция загрузки интервалов (resource_id, date) -> List[Interval]
+            exclude_id: ID бронирования для исключения из проверки
+        """
+        key = (resource_id, booking_date)
+        with self._lock:
+            day = self._days.get(key)
+            if day is not None:
+                self._days.move_to_end(key)
+            generation = self._generation
+
+        # Загрузка вне блокировки, чтобы не держать другие потоки на запросе к БД
+        if day is None:
+            day = DayIntervals(loader(resource_id, booking_date))
+            with self._lock:
+                if generation == self._generation:
+                    self._days[key] = day
+                    while len(self._days) > self.max_days:
+                        self._days.popitem(last=False)
+
+        return day.overlaps(start_time, end_time, exclude_id)
+
+    # Сброс интервалов ресурса за дату
+    def invalidate(self, resource_id: int, booking_date: date) -> None:
+        with self._lock:
+            self._generation += 1
+            self._days.pop((resource_id, booking_date), None)
+
+    # Сброс всех интервалов ресурса
+    def invalidate_resource(self, resource_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._days if key[0] == resource_id]:
+                del self._days[key]
+
+    # Полный сброс
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._days.clear()
+
+
+# Включение индекса и его размер
+INTERVAL_INDEX_ENABLED = os.getenv("BOOKING_INTERVAL_INDEX", "0") == "1"
+INTERVAL_INDEX_MAX_DAYS = int(os.getenv("BOOKING_INTERVAL_INDEX_MAX_DAYS", "10000"))
+
+booking_intervals = BookingIntervalIndex(max_days=INTERVAL_INDEX_MAX_DAYS)
+
+
+# Сброс индекса при изменении бронирований или ресурсов другим воркером
+def _on_remote_change(table: str) -> None:
+    if table in (BOOKINGS, RESOURCES):
+        booking_intervals.clear()
+
+
+table_versions.on_remote_change(_on_remote_change)
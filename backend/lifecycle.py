@@ -0,0 +1,122 @@
+# Модуль жизненного цикла приложения.
+# Подготовка БД (создание таблиц, обновление схемы, триггеры, заполнение
+# суточной загрузки и журнала изменений) выполняется один раз: в главном
+# процессе сервера (backend.server) до запуска воркеров или, при запуске
+# через uvicorn напрямую, при старте приложения. Каждый воркер при старте
+# настраивает пул потоков, открывает соединения пулов и выполняет горячие
+# запросы, чтобы первые запросы клиентов не платили за компиляцию SQL и
+# построение отчетов. При остановке воркер завершает ленты событий, дожидается
+# активных запросов (это делает сервер) и закрывает пулы соединений.
+
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import signal
+import threading
+
+import anyio.to_thread
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend import crud, models
+from backend.booking_events import booking_events
+from backend.database import (
+    DB_ASYNC, DB_POOL_SIZE, DB_READ_POOL_SIZE, Base, SessionLocal,
+    async_engine, async_read_engine, engine, get_read_db, read_engine
+)
+
+# Размер пула потоков для синхронных обработчиков и запросов к БД
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+# Прогрев пулов соединений, SQL и кэша отчетов при старте воркера
+STARTUP_WARM_UP = os.getenv("STARTUP_WARM_UP", "1") == "1"
+# Признак того, что БД уже подготовлена главным процессом сервера
+DATABASE_PREPARED_ENV = "DATABASE_PREPARED"
+
+
+# Создание таблиц, недостающих столбцов и индексов, защиты от пересечения бронирований;
+# заполнение суточной загрузки и журнала изменений для БД, созданной до их появления
+def prepare_database() -> None:
+    Base.metadata.create_all(bind=engine)
+    models.upgrade_existing_tables(engine)
+    models.install_booking_overlap_guard(engine)
+    models.install_change_log(engine)
+
+    with SessionLocal() as db:
+        crud.ensure_daily_usage(db)
+        crud.ensure_change_log(db)
+
+
+# Горячие запросы: их SQL попадает в кэш компиляции движка,
+# а отчет о загрузке по умолчанию - в кэш отчетов
+def warm_up_queries(db: Session) -> None:
+    crud.get_resources(db, limit=1)
+    crud.get_employees(db, limit=1)
+    crud.get_bookings(db, limit=1)
+    crud.get_bookings_today(db, limit=1)
+    crud.get_resource_usage_report(db)
+
+
+# Открытие постоянных соединений пула: PRAGMA соединений выполняются заранее
+def _open_connections(sync_engine, count: int) -> None:
+    connections = [sync_engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+
+async def warm_up() -> None:
+    if DB_ASYNC:
+        for pool_engine, count in ((async_engine, DB_POOL_SIZE), (async_read_engine, DB_READ_POOL_SIZE)):
+            connections = [await pool_engine.connect() for _ in range(count)]
+            for connection in connections:
+                await connection.close()
+    else:
+        await run_in_threadpool(_open_connections, engine, DB_POOL_SIZE)
+        await run_in_threadpool(_open_connections, read_engine, DB_READ_POOL_SIZE)
+
+    async with asynccontextmanager(get_read_db)() as db:
+        await db.run(warm_up_queries)
+
+
+# Завершение лент событий по сигналу остановки. Сервер (uvicorn) дожидается
+# завершения активных запросов до остановки приложения, а ленты событий
+# бесконечны: без этого они держали бы остановку до таймаута. Обработчик
+# сервера вызывается следом, поэтому порядок остановки не меняется.
+def end_streams_on_shutdown_signals() -> None:
+    # Обработчики сигналов устанавливаются только в главном потоке
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signal_number)
+        if not callable(previous):
+            continue
+
+        def handler(signal_number, frame, previous=previous):
+            # Блокировка подписок берется в цикле событий, а не в обработчике сигнала
+            loop.call_soon_threadsafe(booking_events.close)
+            previous(signal_number, frame)
+
+        signal.signal(signal_number, handler)
+
+
+async def dispose_engines() -> None:
+    engine.dispose()
+    read_engine.dispose()
+    if DB_ASYNC:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.getenv(DATABASE_PREPARED_ENV) != "1":
+        prepare_database()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    if STARTUP_WARM_UP:
+        await warm_up()
+    end_streams_on_shutdown_signals()
+
+    yield
+
+    booking_events.close()
+    await dispose_engines()
@@ -1,13 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from backend.database import engine, Base
-from backend.routers import employees, resources, bookings
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
+from backend.database import engine, read_engine, async_engine, async_read_engine
+from backend.routers import employees, resources, bookings, sync
+from backend.lifecycle import lifespan
+from backend.pagination import NEXT_CURSOR_HEADER
+from backend.metrics import CONTENT_TYPE, METRICS_ENABLED, MetricsMiddleware, instrument_engine, request_metrics
+from backend.static_assets import FRONTEND_PATH, StaticManifest
 import os
 
-# Создание таблиц
-Base.metadata.create_all(bind=engine)
+# Ответы API больше этого размера сжимаются gzip, байты
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
 
 # Приложение
 app = FastAPI(
@@ -15,7 +19,8 @@ app = FastAPI(
     description="API для системы бронирования офисных ресурсов",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Настройка CORS для разработки
@@ -25,47 +30,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Сжатие больших ответов API. Ответы с Content-Encoding (сжатые заранее
+# файлы фронтенда) и поток событий text/event-stream не сжимаются
+# (Starlette >= 0.46.0, см. requirements.txt)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+# Метрики запросов и SQL запросов всех движков
+if METRICS_ENABLED:
+    for metrics_engine in (engine, read_engine, async_engine, async_read_engine):
+        if metrics_engine is not None:
+            instrument_engine(getattr(metrics_engine, "sync_engine", metrics_engine))
+    app.add_middleware(MetricsMiddleware)
+
+    # Эндпоинт метрик в формате Prometheus
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(content=request_metrics.render(), media_type=CONTENT_TYPE)
+
 # Подключение роутеров
 app.include_router(employees.router)
 app.include_router(resources.router)
 app.include_router(bookings.router)
-
-# Путь к фронтенду
-FRONTEND_PATH = "/app/frontend"
-
-# Подключение статических файлов
-if os.path.exists(FRONTEND_PATH):
-    # Статические файлы фронтенда
-    app.mount("/static", StaticFiles(directory=FRONTEND_PATH), name="static")
-    
-    # Главная страница
-    @app.get("/")
-    async def serve_index():
-        index_file = os.path.join(FRONTEND_PATH, "index.html")
-        if os.path.exists(index_file):
-            return FileResponse(index_file)
-        return {"message": "Frontend files not found"}
-    
-    # Обработка всех путей для SPA
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        #  Поиск статического файла
-        file_path = os.path.join(FRONTEND_PATH, full_path)
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            return FileResponse(file_path)
-        
-        # Если файл не найден
-        index_file = os.path.join(FRONTEND_PATH, "index.html")
-        if os.path.exists(index_file):
-            return FileResponse(index_file)
-        
-        return {"message": "File not found"}
-else:
-    @app.get("/")
-    def root():
-        return {"message": "Backend is running", "docs": "/docs", "status": "Frontend not found"}
+app.include_router(sync.router)
 
 # Эндпоинт health check
 @app.get("/health")
@@ -75,4 +64,26 @@ def health_check():
 # Эндпоинт для проверки доступности API
 @app.get("/api/status")
 def api_status():
-    return {"status": "running", "version": "1.0.0"}
\ No newline at end of file
+    return {"status": "running", "version": "1.0.0"}
+
+# Файлы фронтенда читаются в память при запуске
+static_manifest = StaticManifest.load(FRONTEND_PATH) if os.path.isdir(FRONTEND_PATH) else None
+
+if static_manifest is not None and static_manifest.index is not None:
+    # Прежние адреса /static/... для совместимости
+    @app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_static(path: str, request: Request):
+        asset = static_manifest.get(path)
+        if asset is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
+        return static_manifest.response(request, asset)
+
+    # Файлы фронтенда; остальные пути SPA получают index.html
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_spa(full_path: str, request: Request):
+        asset = static_manifest.get(full_path) or static_manifest.index
+        return static_manifest.response(request, asset)
+else:
+    @app.get("/")
+    def root():
+        return {"message": "Backend is running", "docs": "/docs", "status": "Frontend not found"}
@@ -0,0 +1,224 @@
+# Модуль метрик приложения в текстовом формате Prometheus.
+# Middleware учитывает для каждого запроса шаблон маршрута, статус и длительность,
+# а также число и суммарное время SQL запросов, выполненных за время запроса
+# (по событиям движков SQLAlchemy). Счетчики запроса хранятся в contextvar:
+# он копируется в потоки пула и в greenlet асинхронной сессии, поэтому события
+# движка попадают в метрики именно того запроса, который их вызвал.
+# На горячем пути - несколько обращений к словарям и одна блокировка на запрос.
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import time
+
+from sqlalchemy import event
+
+# Включение сбора метрик и эндпоинта /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Границы корзин гистограмм: длительность запроса в секундах и число SQL запросов
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Метка маршрута для запросов, не совпавших ни с одним маршрутом:
+# сырой путь в метке привел бы к неограниченному числу рядов
+UNMATCHED_ROUTE = "<unmatched>"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Счетчики SQL текущего запроса: [число запросов, суммарное время в секундах]
+_request_sql: ContextVar[Optional[List[float]]] = ContextVar("request_sql", default=None)
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин (без блокировки:
+    вызывается под блокировкой реестра).
+
+    Аргументы:
+        buckets: Верхние границы корзин по возрастанию
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # Последняя корзина - +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Накопленные значения корзин с границами в формате Prometheus
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((_format_value(bound), total))
+        result.append(("+Inf", total + self.counts[-1]))
+        return result
+
+
+class RequestMetrics:
+    """
+    Реестр метрик HTTP запросов.
+
+    Ряды:
+        http_requests_in_flight: Запросы, обрабатываемые сейчас
+        http_requests_total{method, route, status}: Завершенные запросы
+        http_request_duration_seconds{method, route}: Гистограмма длительности
+        http_request_sql_statements{method, route}: Гистограмма числа SQL запросов
+        http_request_sql_duration_seconds_total{method, route}: Суммарное время SQL
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_count: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_seconds: Dict[Tuple[str, str], float] = {}
+        self._lock = Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, duration: float, sql: List[float]) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            status_key = (method, route, status)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.sql_count[key] = Histogram(SQL_COUNT_BUCKETS)
+                self.sql_seconds[key] = 0.0
+            latency.observe(duration)
+            self.sql_count[key].observe(sql[0])
+            self.sql_seconds[key] += sql[1]
+
+    # Текст всех метрик в формате Prometheus
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_in_flight HTTP requests currently being processed.",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total Completed HTTP requests.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{{{_labels(method, route)},status=\"{status}\"}} {count}")
+
+            _render_histograms(
+                lines, "http_request_duration_seconds", "HTTP request latency in seconds.", self.latency
+            )
+            _render_histograms(
+                lines, "http_request_sql_statements", "SQL statements executed per HTTP request.", self.sql_count
+            )
+
+            lines.append("# HELP http_request_sql_duration_seconds_total Time spent in SQL statements.")
+            lines.append("# TYPE http_request_sql_duration_seconds_total counter")
+            for (method, route), seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"http_request_sql_duration_seconds_total{{{_labels(method, route)}}} {_format_value(seconds)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(method: str, route: str) -> str:
+    return f"method=\"{method}\",route=\"{_escape(route)}\""
+
+
+def _render_histograms(lines: List[str], name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = _labels(method, route)
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{{{labels},le=\"{bound}\"}} {count}")
+        lines.append(f"{name}_sum{{{labels}}} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+request_metrics = RequestMetrics()
+
+
+# Учет SQL запросов движка в метриках текущего HTTP запроса.
+# Время запроса хранится в информации соединения, как в рецепте SQLAlchemy.
+def instrument_engine(sync_engine) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _request_sql.get() is not None:
+            conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sql = _request_sql.get()
+        starts = conn.info.get("metrics_query_start")
+        if sql is None or not starts:
+            return
+        sql[0] += 1
+        sql[1] += time.perf_counter() - starts.pop()
+
+
+# Шаблон маршрута, с которым совпал запрос (например, /bookings/{booking_id})
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path is not None else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware сбора метрик HTTP запросов. Длительность считается
+    до отправки последней части тела, в том числе для потоковых ответов.
+
+    Аргументы:
+        app: Приложение ASGI
+        metrics: Реестр метрик
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        sql = [0, 0.0]
+        token = _request_sql.set(sql)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.metrics.started()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_sql.reset(token)
+            self.metrics.finished(
+                scope["method"], _route_template(scope), status_code, time.perf_counter() - started, sql
+            )
@@ -1,7 +1,7 @@
 # Модуль с моделями базы данных.
 # Описание структуры таблиц: Employee, Resource, Booking.
 
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Date, Time, ForeignKey, Index, DDL, event, inspect
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -53,18 +53,216 @@ class Booking(Base):
         date: Дата бронирования
         start_time: Время начала бронирования
         end_time: Время окончания бронирования
+        series_id: ID серии повторяющихся бронирований (если бронирование входит в серию)
         resource: Связь с объектом ресурса
         employee: Связь с объектом сотрудника
     """
     __tablename__ = "bookings"
 
+    # Составные индексы под фильтры поиска: по ресурсу/сотруднику в диапазоне дат
+    # и по диапазону дат с сортировкой по времени начала.
+    # Индекс по ресурсу включает end_time, чтобы проверка пересечений
+    # выполнялась только по индексу, без чтения строк таблицы.
+    __table_args__ = (
+        Index("ix_bookings_resource_date_interval", "resource_id", "date", "start_time", "end_time"),
+        Index("ix_bookings_employee_date_start", "employee_id", "date", "start_time"),
+        Index("ix_bookings_date_start", "date", "start_time"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False, index=True)
     date = Column(Date, nullable=False, index=True)
     start_time = Column(Time, nullable=False)
     end_time = Column(Time, nullable=False)
+    series_id = Column(Integer, ForeignKey("booking_series.id"), nullable=True, index=True)
 
     # Связи с другими таблицами
     resource = relationship("Resource", back_populates="bookings")
     employee = relationship("Employee", back_populates="bookings")
+
+# Модель серий повторяющихся бронирований
+class BookingSeries(Base):
+    """
+    Атрибуты:
+        id: Уникальный идентификатор серии
+        resource_id: ID забронированного ресурса
+        employee_id: ID сотрудника, создавшего серию
+        frequency: Периодичность ("daily", "weekly", "monthly")
+        interval: Шаг повторения (каждые N дней/недель/месяцев)
+        start_date: Дата первого повторения
+        end_date: Дата, до которой повторяется серия (включительно)
+        count: Количество повторений
+        start_time: Время начала каждого повторения
+        end_time: Время окончания каждого повторения
+
+    Повторения хранятся как обычные бронирования со ссылкой series_id.
+    """
+    __tablename__ = "booking_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False, index=True)
+    frequency = Column(String, nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)
+    count = Column(Integer, nullable=True)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+
+# Защита от пересечения бронирований на уровне БД (SQLite).
+# Триггеры срабатывают даже при одновременной записи из нескольких процессов.
+BOOKING_OVERLAP_MESSAGE = "booking_overlap"
+
+BOOKING_OVERLAP_TRIGGERS = [
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS bookings_no_overlap_insert
+        BEFORE INSERT ON bookings
+        WHEN EXISTS (
+            SELECT 1 FROM bookings
+            WHERE resource_id = NEW.resource_id
+              AND date = NEW.date
+              AND start_time < NEW.end_time
+              AND end_time > NEW.start_time
+        )
+        BEGIN
+            SELECT RAISE(ABORT, '{BOOKING_OVERLAP_MESSAGE}');
+        END
+    """),
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS bookings_no_overlap_update
+        BEFORE UPDATE OF resource_id, date, start_time, end_time ON bookings
+        WHEN EXISTS (
+            SELECT 1 FROM bookings
+            WHERE resource_id = NEW.resource_id
+              AND date = NEW.date
+              AND start_time < NEW.end_time
+              AND end_time > NEW.start_time
+              AND id != NEW.id
+        )
+        BEGIN
+            SELECT RAISE(ABORT, '{BOOKING_OVERLAP_MESSAGE}');
+        END
+    """),
+]
+
+for trigger in BOOKING_OVERLAP_TRIGGERS:
+    event.listen(Booking.__table__, "after_create", trigger.execute_if(dialect="sqlite"))
+
+# Добавление в уже существующую БД новых nullable столбцов и индексов,
+# которые create_all не создает для существующих таблиц
+def upgrade_existing_tables(bind) -> None:
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+# Создание триггеров в уже существующей БД
+def install_booking_overlap_guard(bind) -> None:
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as connection:
+        for trigger in BOOKING_OVERLAP_TRIGGERS:
+            connection.execute(trigger)
+
+# Удаление триггеров (на время массовой загрузки заведомо непересекающихся данных)
+def remove_booking_overlap_guard(bind) -> None:
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as connection:
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS bookings_no_overlap_insert")
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS bookings_no_overlap_update")
+
+# Модель суточной загрузки ресурсов (агрегат по бронированиям)
+class BookingDailyUsage(Base):
+    """
+    Атрибуты:
+        resource_id: ID ресурса
+        date: Дата
+        booked_seconds: Суммарная длительность бронирований за день в секундах
+        booking_count: Количество бронирований за день
+
+    Таблица поддерживается инкрементально операциями CRUD над бронированиями
+    и может быть полностью пересчитана командой backend.rebuild_daily_usage.
+    """
+    __tablename__ = "booking_daily_usage"
+
+    resource_id = Column(Integer, ForeignKey("resources.id"), primary_key=True)
+    date = Column(Date, primary_key=True, index=True)
+    booked_seconds = Column(Integer, nullable=False, default=0)
+    booking_count = Column(Integer, nullable=False, default=0)
+
+# Модель журнала изменений для синхронизации клиентов
+class ChangeLog(Base):
+    """
+    Атрибуты:
+        version: Версия изменения, монотонно растет (AUTOINCREMENT не переиспользует номера)
+        entity: Таблица измененной записи ("employees", "resources", "bookings")
+        entity_id: ID измененной записи
+        deleted: Запись удалена (надгробие)
+
+    Журнал хранит только последнее изменение каждой записи: новое изменение
+    заменяет прежнее с новой версией, поэтому размер журнала ограничен числом
+    записей, включая удаленные. Заполняется триггерами в транзакции изменения.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ux_change_log_entity", "entity", "entity_id", unique=True),
+        {"sqlite_autoincrement": True},
+    )
+
+    version = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+
+# Таблицы, изменения которых записываются в журнал
+CHANGE_LOG_TABLES = (Employee.__tablename__, Resource.__tablename__, Booking.__tablename__)
+
+# Триггеры журнала: вставка, изменение и удаление записи в той же транзакции
+# (в том числе массовые UPDATE/DELETE и каскадные удаления)
+def _change_log_trigger(table: str, operation: str, row: str, deleted: int) -> DDL:
+    return DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_change_log_{operation.lower()}
+        AFTER {operation} ON {table}
+        BEGIN
+            INSERT OR REPLACE INTO change_log (entity, entity_id, deleted)
+            VALUES ('{table}', {row}.id, {deleted});
+        END
+    """)
+
+CHANGE_LOG_TRIGGERS = {
+    table: [
+        _change_log_trigger(table, "INSERT", "NEW", 0),
+        _change_log_trigger(table, "UPDATE", "NEW", 0),
+        _change_log_trigger(table, "DELETE", "OLD", 1),
+    ]
+    for table in CHANGE_LOG_TABLES
+}
+
+for table, triggers in CHANGE_LOG_TRIGGERS.items():
+    for trigger in triggers:
+        event.listen(Base.metadata.tables[table], "after_create", trigger.execute_if(dialect="sqlite"))
+
+# Создание триггеров журнала изменений в уже существующей БД
+def install_change_log(bind) -> None:
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as connection:
+        for triggers in CHANGE_LOG_TRIGGERS.values():
+            for trigger in triggers:
+                connection.execute(trigger)
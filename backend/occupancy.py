@@ -0,0 +1,59 @@
+# Модуль битовых карт занятости ресурсов.
+# Рабочий день делится на слоты заданной длины; карта дня - набор битов,
+# где бит i установлен, если слот i пересекается хотя бы с одним бронированием.
+# Бит i хранится в байте i // 8 под номером i % 8 (младший бит - первый слот),
+# байты кодируются в base64. День с 48 слотами по 15 минут занимает 8 символов.
+
+from datetime import time
+from typing import Iterable, Tuple
+import base64
+
+
+# Время в минутах от полуночи
+def minutes_of(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+# Количество слотов в рабочем дне
+def slot_count(day_start: time, day_end: time, granularity: int) -> int:
+    return (minutes_of(day_end) - minutes_of(day_start)) // granularity
+
+
+# Битовая маска слотов, занятых интервалами одного дня
+def occupancy_mask(
+    intervals: Iterable[Tuple[time, time]],
+    day_start: time,
+    granularity: int,
+    slots: int
+) -> int:
+    """
+    Аргументы:
+        intervals: Интервалы бронирований (начало, окончание)
+        day_start: Начало рабочего дня (начало первого слота)
+        granularity: Длина слота в минутах
+        slots: Количество слотов в дне
+
+    Результаты:
+        Целое число, бит i которого установлен, если слот i занят
+        (слот занят при любом пересечении с бронированием)
+    """
+    origin = minutes_of(day_start)
+    mask = 0
+    for start_time, end_time in intervals:
+        first = max((minutes_of(start_time) - origin) // granularity, 0)
+        # Окончание округляется вверх до границы слота
+        last = min(-((origin - minutes_of(end_time)) // granularity), slots)
+        if last > first:
+            mask |= ((1 << (last - first)) - 1) << first
+    return mask
+
+
+# Кодирование маски дня в base64
+def encode_mask(mask: int, slots: int) -> str:
+    return base64.b64encode(mask.to_bytes((slots + 7) // 8, "little")).decode("ascii")
+
+
+# Декодирование карты дня в список признаков занятости слотов
+def decode_mask(value: str, slots: int) -> list:
+    mask = int.from_bytes(base64.b64decode(value), "little")
+    return [bool(mask >> slot & 1) for slot in range(slots)]
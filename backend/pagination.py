@@ -0,0 +1,105 @@
+# Модуль курсорной (keyset) пагинации.
+# Курсор - непрозрачная строка с ключом сортировки последней записи страницы.
+# Следующая страница выбирается условием "ключ > курсора" по индексу,
+# поэтому ее стоимость не зависит от глубины, в отличие от OFFSET.
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, time
+from typing import Any, List, NamedTuple, Optional, Sequence
+import json
+
+from sqlalchemy import literal, tuple_
+
+
+class InvalidCursorError(ValueError):
+    """Курсор поврежден или не соответствует порядку сортировки списка."""
+
+
+class Page(NamedTuple):
+    """
+    Атрибуты:
+        items: Записи страницы
+        next_cursor: Курсор следующей страницы (None для последней)
+    """
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+# Кодирование значений ключа сортировки в курсор
+def encode_cursor(values: Sequence[Any]) -> str:
+    serialized = [value.isoformat() if isinstance(value, (date, time)) else value for value in values]
+    payload = json.dumps(serialized, separators=(",", ":")).encode()
+    return urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+# Декодирование курсора в значения с типами столбцов сортировки
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursorError("Некорректный курсор пагинации")
+
+        decoded = []
+        for value, column in zip(values, columns):
+            python_type = column.type.python_type
+            if python_type in (date, time):
+                decoded.append(python_type.fromisoformat(value))
+            else:
+                decoded.append(python_type(value))
+        return decoded
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError) as error:
+        raise InvalidCursorError("Некорректный курсор пагинации") from error
+
+
+# Получение страницы запроса, упорядоченного по столбцам columns
+def keyset_page(
+    query,
+    columns: Sequence[Any],
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0
+) -> Page:
+    """
+    Аргументы:
+        query: Запрос ORM без сортировки
+        columns: Столбцы ключа сортировки; последний должен быть уникальным (обычно id)
+        cursor: Курсор, полученный с предыдущей страницы
+        limit: Размер страницы
+        skip: Устаревшее смещение, применяется только без курсора
+
+    Результаты:
+        Страница записей и курсор следующей страницы
+
+    Исключения:
+        InvalidCursorError: Если курсор некорректен
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        bound = [literal(value, column.type) for value, column in zip(values, columns)]
+        query = query.filter(tuple_(*columns) > tuple_(*bound))
+
+    query = query.order_by(*columns)
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    # Одна лишняя запись показывает, есть ли следующая страница
+    items = query.limit(limit + 1).all()
+    if len(items) <= limit:
+        return Page(items, None)
+
+    items = items[:limit]
+    last = items[-1]
+    return Page(items, encode_cursor([getattr(last, column.key) for column in columns]))
+
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Передача курсора следующей страницы в заголовке ответа
+def set_next_cursor(response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
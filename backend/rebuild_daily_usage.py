@@ -0,0 +1,22 @@
+# Скрипт полного пересчета таблицы суточной загрузки ресурсов (booking_daily_usage)
+#
+# Запуск: python -m backend.rebuild_daily_usage
+
+from backend.database import Base, SessionLocal, engine
+from backend import crud
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        rows = crud.rebuild_daily_usage(db)
+    finally:
+        db.close()
+
+    print(f"[OK] Суточная загрузка пересчитана: {rows} записей")
+
+
+if __name__ == "__main__":
+    main()
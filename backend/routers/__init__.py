@@ -3,5 +3,6 @@
 from .employees import router as employees_router
 from .resources import router as resources_router
 from .bookings import router as bookings_router
+from .sync import router as sync_router
 
-__all__ = ["employees_router", "resources_router", "bookings_router"]
\ No newline at end of file
+__all__ = ["employees_router", "resources_router", "bookings_router", "sync_router"]
\ No newline at end of file
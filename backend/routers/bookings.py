@@ -2,15 +2,24 @@
 # Содержит эндпоинты для CRUD операций, фильтрации и отчетов.
 
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import date, time, timedelta
+from typing import List, Literal, Optional
+import asyncio
 
-from backend.database import get_db
+from backend.database import DB_ASYNC, AsyncReadSessionLocal, Database, DatabaseBusyError, ReadSessionLocal, get_database, get_read_db
 from backend import models
 from backend import schemas
 from backend import crud
+from backend.pagination import InvalidCursorError, set_next_cursor
+from backend.export import EXPORT_FORMATS, export_header, export_rows
+from backend.serialization import JsonSerializer, fast_json_response
+from backend.booking_events import BOOKING_EVENTS_KEEPALIVE, Subscription, booking_events, format_sse
 
+# Сериализация списков бронирований (быстрый путь FAST_JSON)
+BOOKING_DETAIL_LIST = JsonSerializer(schemas.BookingDetail, many=True)
 
 # Описание
 router = APIRouter(
@@ -27,9 +36,9 @@ router = APIRouter(
     summary="Создать новое бронирование",
     description="Создает новое бронирование с проверкой на пересечение с существующими бронированиями."
 )
-def create_booking(
+async def create_booking(
     booking: schemas.BookingCreate,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -40,6 +49,7 @@ def create_booking(
         HTTPException 400: Если время окончания раньше времени начала
         HTTPException 404: Если ресурс или сотрудник не найдены
         HTTPException 409: Если ресурс уже занят в это время
+        HTTPException 503: Если БД занята параллельными записями
     """
     # Валидация времени
     if booking.end_time <= booking.start_time:
@@ -49,7 +59,7 @@ def create_booking(
         )
 
     # Проверка существования ресурса
-    db_resource = crud.get_resource(db, resource_id=booking.resource_id)
+    db_resource = await db.run(crud.get_resource, resource_id=booking.resource_id)
     if not db_resource:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,125 +67,607 @@ def create_booking(
         )
 
     # Проверка существования сотрудника
-    db_employee = crud.get_employee(db, employee_id=booking.employee_id)
+    db_employee = await db.run(crud.get_employee, employee_id=booking.employee_id)
     if not db_employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Сотрудник не найден"
         )
 
-    # Проверка на пересечение бронирований
-    if crud.check_booking_conflict(
-        db,
-        resource_id=booking.resource_id,
-        booking_date=booking.date,
-        start_time=booking.start_time,
-        end_time=booking.end_time
-    ):
+    # Проверка на пересечение и создание выполняются атомарно
+    try:
+        return await db.run(crud.create_booking, booking=booking)
+    except crud.BookingConflictError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Ресурс уже забронирован на выбранный промежуток времени"
         )
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
 
-    return crud.create_booking(db=db, booking=booking)
+# Эндпоинт массового создания бронирований
+@router.post(
+    "/bulk",
+    response_model=schemas.BookingBulkResult,
+    summary="Создать пакет бронирований",
+    description="Создает до 1000 бронирований за один запрос. Конфликты проверяются внутри пакета и с существующими бронированиями, вставка выполняется одной транзакцией."
+)
+async def create_bookings_bulk(
+    payload: schemas.BookingBulkCreate,
+    db: Database = Depends(get_database)
+):
+    """
+    Аргументы:
+        payload: Бронирования и режим обработки (all_or_nothing или best_effort)
+    Результаты:
+        Количество созданных и отклоненных бронирований и результат по каждому из них
+    Исключения:
+        HTTPException 409: Если пересечение обнаружено защитой БД
+        HTTPException 503: Если БД занята параллельными записями
+    """
+    try:
+        results = await db.run(
+            crud.create_bookings_bulk,
+            bookings=payload.bookings,
+            all_or_nothing=payload.mode == "all_or_nothing"
+        )
+    except crud.BookingConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ресурс уже забронирован на выбранный промежуток времени"
+        )
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+# Эндпоинт создания серии повторяющихся бронирований
+@router.post(
+    "/series",
+    response_model=schemas.BookingSeriesResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать серию повторяющихся бронирований",
+    description="Создает ежедневную, еженедельную или ежемесячную серию бронирований. Все повторения проверяются на пересечения одним запросом и создаются одной транзакцией."
+)
+async def create_booking_series(
+    series: schemas.BookingSeriesCreate,
+    db: Database = Depends(get_database)
+):
+    """
+    Аргументы:
+        series: Правило повторения, ресурс, сотрудник и время
+    Результаты:
+        Серия, созданные повторения и даты, пропущенные из-за конфликтов
+    Исключения:
+        HTTPException 400: Если правило повторения или время заданы некорректно
+        HTTPException 404: Если ресурс или сотрудник не найдены
+        HTTPException 409: Если ресурс занят в какие-либо из дат серии
+        HTTPException 503: Если БД занята параллельными записями
+    """
+    # Валидация времени и правила повторения
+    if series.end_time <= series.start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Время завершения должно быть после времени начала"
+        )
+    if series.end_date is None and series.count is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Необходимо указать дату окончания серии или количество повторений"
+        )
+    if series.end_date is not None and series.count is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Укажите либо дату окончания серии, либо количество повторений, но не оба"
+        )
+    if series.end_date is not None and series.end_date < series.start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Дата окончания серии должна быть не раньше даты начала"
+        )
+
+    dates = crud.expand_series_dates(
+        series.frequency,
+        series.interval,
+        series.start_date,
+        end_date=series.end_date,
+        count=series.count
+    )
+    if len(dates) > crud.MAX_SERIES_OCCURRENCES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Серия не может содержать более {crud.MAX_SERIES_OCCURRENCES} повторений"
+        )
+
+    # Проверка существования ресурса и сотрудника
+    if not await db.run(crud.get_resource, resource_id=series.resource_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ресурс не найден"
+        )
+    if not await db.run(crud.get_employee, employee_id=series.employee_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сотрудник не найден"
+        )
+
+    try:
+        return await db.run(crud.create_booking_series, series=series, dates=dates)
+    except crud.BookingConflictError as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Ресурс уже забронирован на выбранный промежуток времени",
+                "dates": [str(conflict_date) for conflict_date in error.dates]
+            }
+        )
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
+
+# Эндпоинт изменения повторений серии
+@router.put(
+    "/series/{series_id}",
+    response_model=schemas.BookingSeriesChange,
+    summary="Изменить повторения серии",
+    description="Изменяет время или сотрудника у всех повторений серии либо у повторений начиная с даты from_date (\"это и последующие\") одним запросом."
+)
+async def update_booking_series(
+    series_id: int,
+    changes: schemas.BookingSeriesUpdate,
+    from_date: Optional[date] = None,
+    db: Database = Depends(get_database)
+):
+    """
+    Аргументы:
+        series_id: ID серии
+        changes: Новое время и/или сотрудник
+        from_date: Первая изменяемая дата (по умолчанию вся серия)
+    Результаты:
+        Количество измененных повторений
+    Исключения:
+        HTTPException 400: Если время окончания раньше времени начала
+        HTTPException 404: Если серия или сотрудник не найдены
+        HTTPException 409: Если новое время конфликтует с другими бронированиями
+        HTTPException 503: Если БД занята параллельными записями
+    """
+    db_series = await db.run(crud.get_booking_series, series_id=series_id)
+    if db_series is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Серия не найдена"
+        )
+
+    # Валидация времени
+    start_time = changes.start_time if changes.start_time is not None else db_series.start_time
+    end_time = changes.end_time if changes.end_time is not None else db_series.end_time
+    if end_time <= start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Время завершения должно быть после времени начала"
+        )
+
+    # Проверка существования сотрудника
+    if changes.employee_id is not None and not await db.run(crud.get_employee, employee_id=changes.employee_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сотрудник не найден"
+        )
+
+    try:
+        affected = await db.run(crud.update_booking_series, series_id=series_id, changes=changes, from_date=from_date)
+    except crud.BookingConflictError as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Ресурс уже забронирован на выбранный промежуток времени",
+                "dates": [str(conflict_date) for conflict_date in error.dates]
+            }
+        )
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
+
+    # Серия могла быть удалена параллельным запросом
+    if affected is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Серия не найдена"
+        )
+    return {"series_id": series_id, "affected": affected}
+
+# Эндпоинт отмены повторений серии
+@router.delete(
+    "/series/{series_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Отменить повторения серии",
+    description="Удаляет все повторения серии либо повторения начиная с даты from_date (\"это и последующие\") одним запросом."
+)
+async def cancel_booking_series(
+    series_id: int,
+    from_date: Optional[date] = None,
+    db: Database = Depends(get_database)
+):
+    """
+    Аргументы:
+        series_id: ID серии
+        from_date: Первая отменяемая дата (по умолчанию вся серия)
+    Исключения:
+        HTTPException 404: Если серия не найдена
+        HTTPException 503: Если БД занята параллельными записями
+    """
+    try:
+        deleted = await db.run(crud.cancel_booking_series, series_id=series_id, from_date=from_date)
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
+
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Серия не найдена"
+        )
+    return None
 
 # Эндпоинт получения списка всех бронирований
 @router.get(
     "/",
     response_model=List[schemas.BookingDetail],
     summary="Получить список всех бронирований",
-    description="Возвращает список всех бронирований с информацией о ресурсах и сотрудниках."
+    description="Возвращает список всех бронирований с информацией о ресурсах и сотрудниках, упорядоченный по дате и времени начала. Курсор следующей страницы передается в заголовке X-Next-Cursor."
 )
-def read_bookings(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+async def read_bookings(
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
-        skip: Количество записей для пропуска (для пагинации)
+        skip: Количество записей для пропуска (устарело, используйте cursor)
         limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
     Результаты:
         Список бронирований с детальной информацией
+    Исключения:
+        HTTPException 400: Если курсор некорректен
     """
-    # Получения списка бронирований
-    bookings = crud.get_bookings(db, skip=skip, limit=limit)
-    return bookings
+    # Получения страницы бронирований
+    try:
+        page = await db.run(crud.get_bookings, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursorError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+
+    set_next_cursor(response, page.next_cursor)
+    return fast_json_response(BOOKING_DETAIL_LIST, page.items, response)
 
 # Эндпоинт получения бронирования на сегодня
 @router.get(
     "/today",
     response_model=List[schemas.BookingDetail],
     summary="Получить бронирования на сегодня",
-    description="Возвращает все бронирования на сегодняшнюю дату."
+    description="Возвращает бронирования на сегодняшнюю дату постранично. Курсор следующей страницы передается в заголовке X-Next-Cursor."
 )
-def read_bookings_today(db: Session = Depends(get_db)):
+async def read_bookings_today(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
+):
     """
+    Аргументы:
+        limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
     Результаты:
         Список бронирований на сегодня
+    Исключения:
+        HTTPException 400: Если курсор некорректен
     """
-    bookings = crud.get_bookings_today(db)
-    return bookings
+    try:
+        page = await db.run(crud.get_bookings_today, limit=limit, cursor=cursor)
+    except InvalidCursorError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+
+    set_next_cursor(response, page.next_cursor)
+    return fast_json_response(BOOKING_DETAIL_LIST, page.items, response)
 
 # Эндпоинт получения бронирований по ресурсу
 @router.get(
     "/by_resource/{resource_id}",
     response_model=List[schemas.BookingDetail],
     summary="Получить бронирования по ресурсу",
-    description="Возвращает все бронирования для конкретного ресурса (расписание комнаты)."
+    description="Возвращает бронирования конкретного ресурса (расписание комнаты) постранично. Курсор следующей страницы передается в заголовке X-Next-Cursor."
 )
-def read_bookings_by_resource(
+async def read_bookings_by_resource(
     resource_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
         resource_id: ID ресурса
+        limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
     Результаты:
         Список бронирований для ресурса
     Исключения:
+        HTTPException 400: Если курсор некорректен
         HTTPException 404: Если ресурс не найден
     """
     # Проверка существования ресурса
-    db_resource = crud.get_resource(db, resource_id=resource_id)
+    db_resource = await db.run(crud.get_resource, resource_id=resource_id)
     if not db_resource:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Ресурс не найден"
         )
 
-    bookings = crud.get_bookings_by_resource(db, resource_id=resource_id)
-    return bookings
+    try:
+        page = await db.run(crud.get_bookings_by_resource, resource_id=resource_id, limit=limit, cursor=cursor)
+    except InvalidCursorError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+
+    set_next_cursor(response, page.next_cursor)
+    return fast_json_response(BOOKING_DETAIL_LIST, page.items, response)
 
 # Эндпоинт получения бронирования по сотруднику
 @router.get(
     "/by_employee/{employee_id}",
     response_model=List[schemas.BookingDetail],
     summary="Получить бронирования по сотруднику",
-    description="Возвращает все бронирования конкретного сотрудника ('мои бронирования')."
+    description="Возвращает бронирования конкретного сотрудника ('мои бронирования') постранично. Курсор следующей страницы передается в заголовке X-Next-Cursor."
 )
-def read_bookings_by_employee(
+async def read_bookings_by_employee(
     employee_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
         employee_id: ID сотрудника
+        limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
     Результаты:
         Список бронирований сотрудника
     Исключения:
+        HTTPException 400: Если курсор некорректен
         HTTPException 404: Если сотрудник не найден
     """
     # Проверка существования сотрудника
-    db_employee = crud.get_employee(db, employee_id=employee_id)
+    db_employee = await db.run(crud.get_employee, employee_id=employee_id)
     if not db_employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Сотрудник не найден"
         )
 
-    bookings = crud.get_bookings_by_employee(db, employee_id=employee_id)
-    return bookings
+    try:
+        page = await db.run(crud.get_bookings_by_employee, employee_id=employee_id, limit=limit, cursor=cursor)
+    except InvalidCursorError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+
+    set_next_cursor(response, page.next_cursor)
+    return fast_json_response(BOOKING_DETAIL_LIST, page.items, response)
+
+# Эндпоинт поиска бронирований с фильтрами
+@router.get(
+    "/search",
+    response_model=List[schemas.BookingDetail],
+    summary="Поиск бронирований",
+    description="Возвращает бронирования, отфильтрованные по датам, ресурсам, сотрудникам, типу ресурса и времени суток. Фильтрация выполняется на стороне БД. Курсор следующей страницы передается в заголовке X-Next-Cursor."
+)
+async def search_bookings(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    resource_id: Optional[List[int]] = Query(None),
+    employee_id: Optional[List[int]] = Query(None),
+    type: Optional[str] = None,
+    time_from: Optional[time] = None,
+    time_to: Optional[time] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
+):
+    """
+    Аргументы:
+        date_from: Начало диапазона дат (включительно)
+        date_to: Конец диапазона дат (включительно)
+        resource_id: ID ресурсов (можно указать несколько раз)
+        employee_id: ID сотрудников (можно указать несколько раз)
+        type: Тип ресурса
+        time_from: Начало окна времени суток
+        time_to: Конец окна времени суток
+        skip: Количество записей для пропуска (устарело, используйте cursor)
+        limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
+    Результаты:
+        Список бронирований, отсортированный по дате и времени начала
+    Исключения:
+        HTTPException 400: Если диапазон дат или времени или курсор заданы некорректно
+    """
+    # Валидация диапазонов
+    if date_from is not None and date_to is not None and date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+    if time_from is not None and time_to is not None and time_to <= time_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Время завершения должно быть после времени начала"
+        )
+
+    try:
+        page = await db.run(
+            crud.search_bookings,
+            date_from=date_from,
+            date_to=date_to,
+            resource_ids=resource_id,
+            employee_ids=employee_id,
+            resource_type=type,
+            time_from=time_from,
+            time_to=time_to,
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+    except InvalidCursorError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+
+    set_next_cursor(response, page.next_cursor)
+    return fast_json_response(BOOKING_DETAIL_LIST, page.items, response)
+
+# Потоковая выгрузка бронирований в отдельной сессии чтения, живущей до конца ответа
+async def stream_bookings_export(export_format: str, **filters):
+    yield export_header(export_format, crud.EXPORT_COLUMNS)
+
+    if DB_ASYNC:
+        async with AsyncReadSessionLocal() as session:
+            async for rows in crud.stream_booking_export_rows(session, **filters):
+                yield export_rows(export_format, crud.EXPORT_COLUMNS, rows)
+        return
+
+    # Синхронный курсор читается в пуле потоков, по порции за раз
+    db = ReadSessionLocal()
+    try:
+        partitions = crud.iter_booking_export_rows(db, **filters)
+        while (rows := await run_in_threadpool(next, partitions, None)) is not None:
+            yield export_rows(export_format, crud.EXPORT_COLUMNS, rows)
+    finally:
+        await run_in_threadpool(db.close)
+
+# Эндпоинт выгрузки бронирований
+@router.get(
+    "/export",
+    summary="Выгрузить бронирования",
+    description="Потоково выгружает все бронирования, подходящие под фильтры, в формате NDJSON или CSV. Строки читаются из БД порциями, поэтому память сервера не зависит от объема выгрузки.",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}}
+)
+async def export_bookings(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    resource_id: Optional[List[int]] = Query(None),
+    employee_id: Optional[List[int]] = Query(None),
+    type: Optional[str] = None
+):
+    """
+    Аргументы:
+        format: Формат выгрузки (ndjson или csv)
+        date_from: Начало диапазона дат (включительно)
+        date_to: Конец диапазона дат (включительно)
+        resource_id: ID ресурсов (можно указать несколько раз)
+        employee_id: ID сотрудников (можно указать несколько раз)
+        type: Тип ресурса
+    Результаты:
+        Поток строк бронирований, отсортированных по дате и времени начала
+    Исключения:
+        HTTPException 400: Если диапазон дат задан некорректно
+    """
+    if date_from is not None and date_to is not None and date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+
+    media_type, extension = EXPORT_FORMATS[format]
+    chunks = stream_bookings_export(
+        format,
+        date_from=date_from,
+        date_to=date_to,
+        resource_ids=resource_id,
+        employee_ids=employee_id,
+        resource_type=type
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="bookings.{extension}"'}
+    )
+
+# Поток событий подписки в формате Server-Sent Events
+async def stream_booking_events(subscription: Subscription):
+    try:
+        # Клиент EventSource переподключается через retry мс после обрыва
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), BOOKING_EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            # Клиент не успевал читать события: ему нужно перечитать данные
+            if event is None:
+                yield format_sse("reset", {})
+                return
+            yield format_sse(event["type"], event)
+    finally:
+        booking_events.unsubscribe(subscription)
+
+# Эндпоинт ленты изменений бронирований
+@router.get(
+    "/stream",
+    summary="Лента изменений бронирований",
+    description="Поток Server-Sent Events о создании (created), изменении (updated) и удалении (deleted) бронирований. Подписку можно ограничить ресурсами и датами; событие reset означает, что часть событий потеряна и данные нужно перечитать.",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def stream_bookings(
+    resource_id: Optional[List[int]] = Query(None),
+    date: Optional[List[date]] = Query(None)
+):
+    """
+    Аргументы:
+        resource_id: ID ресурсов (можно указать несколько раз, по умолчанию все)
+        date: Даты бронирований (можно указать несколько раз, по умолчанию все)
+    Результаты:
+        Поток событий; данные события - тип, поля бронирования и, если у бронирования
+        изменились ресурс или дата, их прежние значения (previous)
+    """
+    # Подписка оформляется до начала ответа, чтобы не пропустить события
+    subscription = booking_events.subscribe(resource_ids=resource_id, dates=date)
+    return StreamingResponse(
+        stream_booking_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Эндпоинт получения бронирования по ID
 @router.get(
@@ -184,9 +676,9 @@ def read_bookings_by_employee(
     summary="Получить бронирование по ID",
     description="Возвращает информацию о конкретном бронировании по его ID."
 )
-def read_booking(
+async def read_booking(
     booking_id: int,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
@@ -197,7 +689,7 @@ def read_booking(
         HTTPException 404: Если бронирование не найдено
     """
     # Проверка существования бронироания
-    db_booking = crud.get_booking(db, booking_id=booking_id)
+    db_booking = await db.run(crud.get_booking_detail, booking_id=booking_id)
     if db_booking is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -212,10 +704,10 @@ def read_booking(
     summary="Обновить бронирование",
     description="Обновляет бронирование с проверкой на пересечения."
 )
-def update_booking(
+async def update_booking(
     booking_id: int,
     booking: schemas.BookingUpdate,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -227,9 +719,10 @@ def update_booking(
         HTTPException 404: Если бронирование не найдено
         HTTPException 400: Если время окончания раньше времени начала
         HTTPException 409: Если новое время конфликтует с другими бронированиями
+        HTTPException 503: Если БД занята параллельными записями
     """
     # Получаем существующее бронирование
-    db_booking = crud.get_booking(db, booking_id=booking_id)
+    db_booking = await db.run(crud.get_booking, booking_id=booking_id)
     if not db_booking:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -237,8 +730,6 @@ def update_booking(
         )
 
     # Определяем финальные значения для проверки
-    resource_id = booking.resource_id if booking.resource_id is not None else db_booking.resource_id
-    booking_date = booking.date if booking.date is not None else db_booking.date
     start_time = booking.start_time if booking.start_time is not None else db_booking.start_time
     end_time = booking.end_time if booking.end_time is not None else db_booking.end_time
 
@@ -249,21 +740,26 @@ def update_booking(
             detail="Время завершения должно быть после времени начала"
         )
 
-    # Проверка на пересечение с другими бронированиями (исключая текущее)
-    if crud.check_booking_conflict(
-        db,
-        resource_id=resource_id,
-        booking_date=booking_date,
-        start_time=start_time,
-        end_time=end_time,
-        exclude_booking_id=booking_id
-    ):
+    # Проверка на пересечение с другими бронированиями и обновление выполняются атомарно
+    try:
+        db_booking = await db.run(crud.update_booking, booking_id=booking_id, booking=booking)
+    except crud.BookingConflictError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Ресурс уже забронирован на выбранный промежуток времени"
         )
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
 
-    db_booking = crud.update_booking(db, booking_id=booking_id, booking=booking)
+    # Бронирование могло быть удалено параллельным запросом
+    if db_booking is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Бронирование не найдено"
+        )
     return db_booking
 
 # Эндпоинт удаления бронирования
@@ -273,9 +769,9 @@ def update_booking(
     summary="Удалить бронирование",
     description="Удаляет бронирование из системы."
 )
-def delete_booking(
+async def delete_booking(
     booking_id: int,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -284,7 +780,13 @@ def delete_booking(
         HTTPException 404: Если бронирование не найдено
     """
     # Проверка успешности удаления
-    success = crud.delete_booking(db, booking_id=booking_id)
+    try:
+        success = await db.run(crud.delete_booking, booking_id=booking_id)
+    except DatabaseBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error)
+        )
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -300,13 +802,157 @@ def delete_booking(
     response_model=List[schemas.ResourceUsageReport],
     tags=["Reports"],
     summary="Отчет по загрузке ресурсов",
-    description="Возвращает суммарное количество часов бронирования каждого ресурса за последний месяц."
+    description="Возвращает суммарное количество часов бронирования каждого ресурса за период (по умолчанию за последний месяц)."
 )
-def get_resource_usage_report(db: Session = Depends(get_db)):
+async def get_resource_usage_report(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    db: Database = Depends(get_read_db)
+):
     """
+    Аргументы:
+        date_from: Начало периода (по умолчанию 30 дней назад)
+        date_to: Конец периода
+        type: Тип ресурса
+        limit: Максимальное количество ресурсов в отчете
     Результаты:
         Список с информацией о ресурсах и суммарных часах бронирования
+    Исключения:
+        HTTPException 400: Если конечная дата раньше начальной
     """
+    if date_from is not None and date_to is not None and date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+
     # Получить отчет
-    report = crud.get_resource_usage_report(db)
+    report = await db.run(
+        crud.get_resource_usage_report,
+        date_from=date_from,
+        date_to=date_to,
+        resource_type=type,
+        limit=limit
+    )
     return report
+
+# Эндпоинт отчета по загрузке с группировкой по измерениям
+@router.get(
+    "/report/usage",
+    response_model=List[schemas.UsageReportRow],
+    response_model_exclude_none=True,
+    tags=["Reports"],
+    summary="Отчет по загрузке",
+    description="Группирует бронирования за период по любому сочетанию измерений (resource, resource_type, employee, day, week, month) и возвращает часы, количество бронирований и загрузку рабочего времени. Отчет строится одним SQL запросом."
+)
+async def get_usage_report(
+    group_by: List[Literal["resource", "resource_type", "employee", "day", "week", "month"]] = Query(["resource"]),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[str] = None,
+    resource_id: Optional[List[int]] = Query(None),
+    employee_id: Optional[List[int]] = Query(None),
+    top: Optional[int] = Query(None, ge=1, le=1000, description="Количество групп с наибольшим числом часов"),
+    day_start: time = time(8, 0),
+    day_end: time = time(20, 0),
+    db: Database = Depends(get_read_db)
+):
+    """
+    Аргументы:
+        group_by: Измерения (можно указать несколько раз)
+        date_from: Начало периода (по умолчанию 30 дней назад)
+        date_to: Конец периода (по умолчанию сегодня)
+        type: Тип ресурса
+        resource_id: ID ресурсов (можно указать несколько раз)
+        employee_id: ID сотрудников (можно указать несколько раз)
+        top: Оставить N групп с наибольшим числом часов
+        day_start: Начало рабочего дня (для загрузки)
+        day_end: Окончание рабочего дня (для загрузки)
+    Результаты:
+        Строки отчета по группам: без top - по измерениям, с top - по убыванию часов
+    Исключения:
+        HTTPException 400: Если измерения повторяются или период и рабочие часы заданы некорректно
+    """
+    date_to = date_to if date_to is not None else date.today()
+    date_from = date_from if date_from is not None else date_to - timedelta(days=30)
+    if len(set(group_by)) != len(group_by):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Измерения группировки не должны повторяться"
+        )
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+    if day_end <= day_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Окончание рабочего дня должно быть после его начала"
+        )
+
+    return await db.run(
+        crud.get_usage_report,
+        group_by=group_by,
+        date_from=date_from,
+        date_to=date_to,
+        day_start=day_start,
+        day_end=day_end,
+        resource_ids=resource_id,
+        employee_ids=employee_id,
+        resource_type=type,
+        top=top
+    )
+
+# Эндпоинт тепловой карты загрузки ресурсов
+@router.get(
+    "/report/heatmap",
+    response_model=schemas.HeatmapReport,
+    tags=["Reports"],
+    summary="Тепловая карта загрузки ресурсов",
+    description="Возвращает для каждого типа ресурсов загрузку в процентах по дням недели и часам рабочего дня за период (по умолчанию за последние 30 дней)."
+)
+async def get_heatmap_report(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[str] = None,
+    day_start: time = time(8, 0),
+    day_end: time = time(20, 0),
+    db: Database = Depends(get_read_db)
+):
+    """
+    Аргументы:
+        date_from: Начало периода (по умолчанию 30 дней назад)
+        date_to: Конец периода (по умолчанию сегодня)
+        type: Тип ресурса (по умолчанию все типы)
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+    Результаты:
+        Часы рабочего дня и карты загрузки по типам ресурсов
+    Исключения:
+        HTTPException 400: Если период или рабочие часы заданы некорректно
+    """
+    date_to = date_to if date_to is not None else date.today()
+    date_from = date_from if date_from is not None else date_to - timedelta(days=30)
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+    if day_end <= day_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Окончание рабочего дня должно быть после его начала"
+        )
+
+    return await db.run(
+        crud.get_heatmap_report,
+        date_from=date_from,
+        date_to=date_to,
+        day_start=day_start,
+        day_end=day_end,
+        resource_type=type
+    )
+
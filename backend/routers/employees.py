@@ -2,15 +2,20 @@
 # Содержит эндпоинты для CRUD операций над сотрудниками.
 
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
 
-from backend.database import get_db
+from backend.database import Database, get_database, get_read_db
 from backend import models
 from backend import schemas
 from backend import crud
+from backend.pagination import NEXT_CURSOR_HEADER, InvalidCursorError
+from backend.serialization import JsonSerializer
+from backend.cache import EMPLOYEES, cached_response
 
+# Сериализация ответов для кэша (быстрый путь FAST_JSON)
+EMPLOYEE_LIST = JsonSerializer(schemas.Employee, many=True)
+EMPLOYEE = JsonSerializer(schemas.Employee)
 
 # Описание
 router = APIRouter(
@@ -27,9 +32,9 @@ router = APIRouter(
     summary="Создать нового сотрудника",
     description="Создает нового сотрудника в системе. Email должен быть уникальным."
 )
-def create_employee(
+async def create_employee(
     employee: schemas.EmployeeCreate,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -40,36 +45,52 @@ def create_employee(
         HTTPException 400: Если email уже зарегистрирован
     """
     # Проверка уникальности email
-    db_employee = crud.get_employee_by_email(db, email=employee.email)
+    db_employee = await db.run(crud.get_employee_by_email, email=employee.email)
     if db_employee:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    return crud.create_employee(db=db, employee=employee)
+    return await db.run(crud.create_employee, employee=employee)
 
 # Эндпоинт получения всех сотрудников
 @router.get(
     "/",
     response_model=List[schemas.Employee],
     summary="Получить список всех сотрудников",
-    description="Возвращает список всех сотрудников с возможностью пагинации."
+    description="Возвращает список всех сотрудников с курсорной пагинацией: курсор следующей страницы передается в заголовке X-Next-Cursor."
 )
-def read_employees(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+async def read_employees(
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
-        skip: Количество записей для пропуска (для пагинации)
+        skip: Количество записей для пропуска (устарело, используйте cursor)
         limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
     Результаты:
-        Список сотрудников
+        Список сотрудников, упорядоченный по ID
+    Исключения:
+        HTTPException 400: Если курсор некорректен
     """
-    # Получение списка сотрудников
-    employees = crud.get_employees(db, skip=skip, limit=limit)
-    return employees
+    # Получение страницы сотрудников
+    async def build():
+        try:
+            page = await db.run(crud.get_employees, skip=skip, limit=limit, cursor=cursor)
+        except InvalidCursorError as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(error)
+            )
+        headers = {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else {}
+        return EMPLOYEE_LIST.dump_json(page.items), headers
+
+    # Повторная загрузка без изменений в таблице отвечает 304 или ответом из кэша
+    return await cached_response(request, [EMPLOYEES], build)
 
 # Эндпоинт получения сотрудника по ID
 @router.get(
@@ -78,9 +99,10 @@ def read_employees(
     summary="Получить сотрудника по ID",
     description="Возвращает информацию о конкретном сотруднике по его ID."
 )
-def read_employee(
+async def read_employee(
     employee_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
@@ -91,13 +113,16 @@ def read_employee(
         HTTPException 404: Если сотрудник не найден
     """
     # Получение сотрудника
-    db_employee = crud.get_employee(db, employee_id=employee_id)
-    if db_employee is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Employee not found"
-        )
-    return db_employee
+    async def build():
+        db_employee = await db.run(crud.get_employee, employee_id=employee_id)
+        if db_employee is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Employee not found"
+            )
+        return EMPLOYEE.dump_json(db_employee), {}
+
+    return await cached_response(request, [EMPLOYEES], build)
 
 # Эндпоинт обновления данных сотрудника
 @router.put(
@@ -106,10 +131,10 @@ def read_employee(
     summary="Обновить данные сотрудника",
     description="Обновляет информацию о сотруднике (имя и/или email)."
 )
-def update_employee(
+async def update_employee(
     employee_id: int,
     employee: schemas.EmployeeUpdate,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -123,14 +148,14 @@ def update_employee(
     """
     # Если обновляется email, проверяем уникальность
     if employee.email:
-        existing = crud.get_employee_by_email(db, email=employee.email)
+        existing = await db.run(crud.get_employee_by_email, email=employee.email)
         if existing and existing.id != employee_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
 
-    db_employee = crud.update_employee(db, employee_id=employee_id, employee=employee)
+    db_employee = await db.run(crud.update_employee, employee_id=employee_id, employee=employee)
     # Если сотрудние не найден
     if db_employee is None:
         raise HTTPException(
@@ -146,9 +171,9 @@ def update_employee(
     summary="Удалить сотрудника",
     description="Удаляет сотрудника из системы."
 )
-def delete_employee(
+async def delete_employee(
     employee_id: int,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -158,7 +183,7 @@ def delete_employee(
         HTTPException 400: Если у сотрудника есть связанные бронирования
     """
     # Попытка удалить сотрудника
-    success = crud.delete_employee(db, employee_id=employee_id)
+    success = await db.run(crud.delete_employee, employee_id=employee_id)
     # Если не найден пользователь
     if not success:
         raise HTTPException(
@@ -2,16 +2,24 @@
 # Содержит эндпоинты для CRUD операций над ресурсами (комнатами, оборудованием).
 
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from datetime import date, time, timedelta
+from typing import List, Optional
 
-from backend.database import get_db
+from backend.database import Database, get_database, get_read_db
 from backend import models
 from backend import schemas
 from backend import crud
+from backend.pagination import NEXT_CURSOR_HEADER, InvalidCursorError
+from backend.serialization import JsonSerializer
+from backend.cache import BOOKINGS, RESOURCES, cached_response
+from backend.occupancy import minutes_of
 
 
+# Сериализация ответов для кэша (быстрый путь FAST_JSON)
+RESOURCE_LIST = JsonSerializer(schemas.Resource, many=True)
+RESOURCE = JsonSerializer(schemas.Resource)
+CALENDAR = JsonSerializer(schemas.OccupancyCalendar)
 
 # Описание
 router = APIRouter(
@@ -28,9 +36,9 @@ router = APIRouter(
     summary="Создать новый ресурс",
     description="Создает новый ресурс в системе (переговорную комнату, проектор и т.д.)."
 )
-def create_resource(
+async def create_resource(
     resource: schemas.ResourceCreate,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -39,30 +47,248 @@ def create_resource(
         Созданный объект ресурса с ID
     """
     # Создание ресурса
-    return crud.create_resource(db=db, resource=resource)
+    return await db.run(crud.create_resource, resource=resource)
 
 # Эндпоинт получения всех ресурсов
 @router.get(
     "/",
     response_model=List[schemas.Resource],
     summary="Получить список всех ресурсов",
-    description="Возвращает список всех доступных ресурсов с возможностью пагинации."
+    description="Возвращает список всех доступных ресурсов с курсорной пагинацией: курсор следующей страницы передается в заголовке X-Next-Cursor."
 )
-def read_resources(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+async def read_resources(
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
-        skip: Количество записей для пропуска (для пагинации)
+        skip: Количество записей для пропуска (устарело, используйте cursor)
         limit: Максимальное количество записей для возврата
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
     Результаты:
-        Список ресурсов
+        Список ресурсов, упорядоченный по ID
+    Исключения:
+        HTTPException 400: Если курсор некорректен
+    """
+    # Получить страницу ресурсов
+    async def build():
+        try:
+            page = await db.run(crud.get_resources, skip=skip, limit=limit, cursor=cursor)
+        except InvalidCursorError as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(error)
+            )
+        headers = {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else {}
+        return RESOURCE_LIST.dump_json(page.items), headers
+
+    # Повторная загрузка без изменений в таблице отвечает 304 или ответом из кэша
+    return await cached_response(request, [RESOURCES], build)
+
+# Максимальная длина периода поиска свободного времени в днях
+MAX_AVAILABILITY_DAYS = 31
+
+# Эндпоинт поиска свободного времени ресурсов
+@router.get(
+    "/availability",
+    response_model=List[schemas.ResourceAvailability],
+    summary="Найти свободное время ресурсов",
+    description="Возвращает свободные промежутки в рабочих часах для каждого подходящего ресурса на дату или период. Все ресурсы обрабатываются двумя запросами к БД."
+)
+async def read_availability(
+    date: date,
+    date_to: Optional[date] = None,
+    min_duration: int = Query(30, ge=1, le=24 * 60, description="Минимальная длительность в минутах"),
+    type: Optional[str] = None,
+    capacity: Optional[int] = Query(None, ge=0, description="Минимальная вместимость"),
+    day_start: time = time(8, 0),
+    day_end: time = time(20, 0),
+    db: Database = Depends(get_read_db)
+):
+    """
+    Аргументы:
+        date: Дата (или начало периода)
+        date_to: Конец периода (по умолчанию совпадает с date)
+        min_duration: Минимальная длительность свободного промежутка в минутах
+        type: Тип ресурса
+        capacity: Минимальная вместимость
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+    Результаты:
+        Ресурсы и даты со свободными промежутками
+    Исключения:
+        HTTPException 400: Если период или рабочие часы заданы некорректно
+    """
+    date_to = date_to if date_to is not None else date
+
+    # Валидация периода и рабочих часов
+    if date_to < date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+    if (date_to - date).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Период не может быть длиннее {MAX_AVAILABILITY_DAYS} дней"
+        )
+    if day_end <= day_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Окончание рабочего дня должно быть после его начала"
+        )
+
+    return await db.run(
+        crud.get_availability,
+        date_from=date,
+        date_to=date_to,
+        day_start=day_start,
+        day_end=day_end,
+        min_duration=min_duration * 60,
+        resource_type=type,
+        min_capacity=capacity
+    )
+
+# Параметры календаря занятости: длина периода по умолчанию и максимальная, дни
+CALENDAR_DEFAULT_DAYS = 7
+MAX_CALENDAR_DAYS = 62
+
+# Конец периода календаря и проверка параметров
+def calendar_period(date_from: date, date_to: Optional[date], day_start: time, day_end: time, granularity: int) -> date:
+    """
+    Результаты:
+        Конец периода (по умолчанию неделя от date_from)
+    Исключения:
+        HTTPException 400: Если период, рабочие часы или длина слота заданы некорректно
+    """
+    date_to = date_to if date_to is not None else date_from + timedelta(days=CALENDAR_DEFAULT_DAYS - 1)
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конечная дата должна быть не раньше начальной"
+        )
+    if (date_to - date_from).days >= MAX_CALENDAR_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Период не может быть длиннее {MAX_CALENDAR_DAYS} дней"
+        )
+    window = minutes_of(day_end) - minutes_of(day_start)
+    if window <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Окончание рабочего дня должно быть после его начала"
+        )
+    if window % granularity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Рабочий день должен делиться на слоты целиком"
+        )
+    return date_to
+
+# Эндпоинт календаря занятости нескольких ресурсов
+@router.get(
+    "/calendar",
+    response_model=schemas.OccupancyCalendar,
+    summary="Календарь занятости ресурсов",
+    description="Возвращает для каждого ресурса битовые карты занятости по дням периода: рабочий день делится на слоты длиной granularity минут, занятый слот отмечается битом. Все ресурсы обрабатываются двумя запросами к БД."
+)
+async def read_resources_calendar(
+    request: Request,
+    date_from: date,
+    date_to: Optional[date] = None,
+    resource_id: Optional[List[int]] = Query(None),
+    type: Optional[str] = None,
+    granularity: int = Query(15, ge=1, le=24 * 60, description="Длина слота в минутах"),
+    day_start: time = time(8, 0),
+    day_end: time = time(20, 0),
+    db: Database = Depends(get_read_db)
+):
+    """
+    Аргументы:
+        date_from: Начало периода
+        date_to: Конец периода (по умолчанию неделя от начала)
+        resource_id: ID ресурсов (можно указать несколько раз, по умолчанию все)
+        type: Тип ресурса
+        granularity: Длина слота в минутах
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+    Результаты:
+        Параметры сетки слотов и карты занятости ресурсов
+    Исключения:
+        HTTPException 400: Если период, рабочие часы или длина слота заданы некорректно
+    """
+    date_to = calendar_period(date_from, date_to, day_start, day_end, granularity)
+
+    async def build():
+        calendar = await db.run(
+            crud.get_occupancy_calendar,
+            date_from=date_from,
+            date_to=date_to,
+            day_start=day_start,
+            day_end=day_end,
+            granularity=granularity,
+            resource_ids=resource_id,
+            resource_type=type
+        )
+        return CALENDAR.dump_json(calendar), {}
+
+    # Табло и календари перезапрашивают карты часто: без изменений - 304 или кэш
+    return await cached_response(request, [BOOKINGS, RESOURCES], build)
+
+# Эндпоинт календаря занятости ресурса
+@router.get(
+    "/{resource_id}/calendar",
+    response_model=schemas.OccupancyCalendar,
+    summary="Календарь занятости ресурса",
+    description="Возвращает битовые карты занятости ресурса по дням периода в том же формате, что и календарь нескольких ресурсов."
+)
+async def read_resource_calendar(
+    resource_id: int,
+    request: Request,
+    date_from: date,
+    date_to: Optional[date] = None,
+    granularity: int = Query(15, ge=1, le=24 * 60, description="Длина слота в минутах"),
+    day_start: time = time(8, 0),
+    day_end: time = time(20, 0),
+    db: Database = Depends(get_read_db)
+):
     """
-    # Получить ресурс
-    resources = crud.get_resources(db, skip=skip, limit=limit)
-    return resources
+    Аргументы:
+        resource_id: ID ресурса
+        date_from: Начало периода
+        date_to: Конец периода (по умолчанию неделя от начала)
+        granularity: Длина слота в минутах
+        day_start: Начало рабочего дня
+        day_end: Окончание рабочего дня
+    Результаты:
+        Параметры сетки слотов и карты занятости ресурса
+    Исключения:
+        HTTPException 400: Если период, рабочие часы или длина слота заданы некорректно
+        HTTPException 404: Если ресурс не найден
+    """
+    date_to = calendar_period(date_from, date_to, day_start, day_end, granularity)
+
+    async def build():
+        calendar = await db.run(
+            crud.get_occupancy_calendar,
+            date_from=date_from,
+            date_to=date_to,
+            day_start=day_start,
+            day_end=day_end,
+            granularity=granularity,
+            resource_ids=[resource_id]
+        )
+        if not calendar["resources"]:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ресурс не найден"
+            )
+        return CALENDAR.dump_json(calendar), {}
+
+    return await cached_response(request, [BOOKINGS, RESOURCES], build)
 
 # Эндпоинт получения ресурса по ID
 @router.get(
@@ -71,9 +297,10 @@ def read_resources(
     summary="Получить ресурс по ID",
     description="Возвращает информацию о конкретном ресурсе по его ID."
 )
-def read_resource(
+async def read_resource(
     resource_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Database = Depends(get_read_db)
 ):
     """
     Аргументы:
@@ -84,13 +311,16 @@ def read_resource(
         HTTPException 404: Если ресурс не найден
     """
     # Получить ресурс по ID
-    db_resource = crud.get_resource(db, resource_id=resource_id)
-    if db_resource is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Resource not found"
-        )
-    return db_resource
+    async def build():
+        db_resource = await db.run(crud.get_resource, resource_id=resource_id)
+        if db_resource is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Resource not found"
+            )
+        return RESOURCE.dump_json(db_resource), {}
+
+    return await cached_response(request, [RESOURCES], build)
 
 # Эндпоинт обновления ресурса
 @router.put(
@@ -99,10 +329,10 @@ def read_resource(
     summary="Обновить данные ресурса",
     description="Обновляет информацию о ресурсе (название, тип, вместимость)."
 )
-def update_resource(
+async def update_resource(
     resource_id: int,
     resource: schemas.ResourceUpdate,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -114,7 +344,7 @@ def update_resource(
         HTTPException 404: Если ресурс не найден
     """
     # Обновление ресурса
-    db_resource = crud.update_resource(db, resource_id=resource_id, resource=resource)
+    db_resource = await db.run(crud.update_resource, resource_id=resource_id, resource=resource)
     if db_resource is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -129,9 +359,9 @@ def update_resource(
     summary="Удалить ресурс",
     description="Удаляет ресурс из системы."
 )
-def delete_resource(
+async def delete_resource(
     resource_id: int,
-    db: Session = Depends(get_db)
+    db: Database = Depends(get_database)
 ):
     """
     Аргументы:
@@ -142,7 +372,7 @@ def delete_resource(
     """
     # Попытка удалить ресурс
     
-    success = crud.delete_resource(db, resource_id=resource_id)
+    success = await db.run(crud.delete_resource, resource_id=resource_id)
     # Если безуспешно
     if not success:
         raise HTTPException(
@@ -0,0 +1,40 @@
+# API роутер синхронизации клиентов.
+# Отдает изменения сотрудников, ресурсов и бронирований после версии клиента
+# по журналу изменений, чтобы клиенты не перечитывали все данные.
+
+
+from fastapi import APIRouter, Depends, Query
+
+from backend.database import Database, get_read_db
+from backend import schemas
+from backend import crud
+
+# Максимальное количество изменений в одном ответе
+SYNC_MAX_LIMIT = 5000
+
+# Описание
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+# Эндпоинт получения изменений после версии клиента
+@router.get(
+    "/changes",
+    response_model=schemas.SyncChanges,
+    summary="Получить изменения после версии",
+    description="Возвращает сотрудников, ресурсов и бронирования, созданные или измененные после версии since, и ID удаленных записей. Пока has_more равен true, следующий запрос выполняется с since, равным полученной version."
+)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=SYNC_MAX_LIMIT),
+    db: Database = Depends(get_read_db)
+):
+    """
+    Аргументы:
+        since: Последняя полученная клиентом версия (0 - полная загрузка)
+        limit: Максимальное количество изменений в ответе
+    Результаты:
+        Текущие значения измененных записей, ID удаленных записей и новая версия клиента
+    """
+    return await db.run(crud.get_changes, since=since, limit=limit)
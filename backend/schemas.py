@@ -4,7 +4,7 @@
 
 from pydantic import BaseModel, EmailStr, Field
 from datetime import date as DateType, time as TimeType
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 # Схемы работников
@@ -61,6 +61,37 @@ class Resource(ResourceBase):
         from_attributes = True
 
 
+# Схемы доступности ресурсов
+class TimeSlot(BaseModel):
+    # Промежуток времени в пределах дня
+    start_time: TimeType = Field(..., description="Начало промежутка")
+    end_time: TimeType = Field(..., description="Окончание промежутка")
+
+
+class ResourceAvailability(BaseModel):
+    # Свободные промежутки ресурса на дату
+    resource: Resource
+    date: DateType = Field(..., description="Дата")
+    free_slots: List[TimeSlot] = Field(..., description="Свободные промежутки, по возрастанию времени")
+
+
+class ResourceOccupancy(BaseModel):
+    # Битовые карты занятости ресурса
+    resource_id: int
+    days: List[str] = Field(..., description="Карты занятости по дням периода (base64, бит i - слот i, младший бит первый)")
+
+
+class OccupancyCalendar(BaseModel):
+    # Календарь занятости ресурсов по слотам
+    date_from: DateType
+    date_to: DateType
+    day_start: TimeType = Field(..., description="Начало первого слота")
+    day_end: TimeType = Field(..., description="Окончание последнего слота")
+    granularity: int = Field(..., description="Длина слота в минутах")
+    slots: int = Field(..., description="Количество слотов в дне")
+    resources: List[ResourceOccupancy]
+
+
 # Схемы бронирований
 class BookingBase(BaseModel):
     # Базовая схема бронирования с общими атрибутами
@@ -88,6 +119,7 @@ class BookingUpdate(BaseModel):
 class Booking(BookingBase):
     # Схема бронирования для ответа API
     id: int
+    series_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -102,6 +134,78 @@ class BookingDetail(Booking):
         from_attributes = True
 
 
+# Схемы массового создания бронирований
+class BookingBulkCreate(BaseModel):
+    # Схема пакета бронирований
+    bookings: List[BookingCreate] = Field(..., min_length=1, max_length=1000, description="Бронирования для создания")
+    mode: Literal["all_or_nothing", "best_effort"] = Field(
+        "all_or_nothing",
+        description="all_or_nothing - при любой ошибке ничего не создается; best_effort - создаются все корректные"
+    )
+
+
+class BookingBulkItemResult(BaseModel):
+    # Результат обработки одного бронирования из пакета
+    index: int = Field(..., description="Позиция бронирования в пакете")
+    status: Literal["created", "invalid", "not_found", "conflict", "skipped"] = Field(..., description="Результат обработки")
+    booking: Optional[Booking] = Field(None, description="Созданное бронирование")
+    detail: Optional[str] = Field(None, description="Причина отказа")
+
+
+class BookingBulkResult(BaseModel):
+    # Итог массового создания бронирований
+    created: int = Field(..., ge=0, description="Количество созданных бронирований")
+    failed: int = Field(..., ge=0, description="Количество отклоненных бронирований")
+    results: List[BookingBulkItemResult]
+
+
+# Схемы серий повторяющихся бронирований
+class BookingSeriesBase(BaseModel):
+    # Базовая схема серии с правилом повторения
+    resource_id: int = Field(..., gt=0, description="ID ресурса")
+    employee_id: int = Field(..., gt=0, description="ID сотрудника")
+    frequency: Literal["daily", "weekly", "monthly"] = Field(..., description="Периодичность повторения")
+    interval: int = Field(1, ge=1, le=52, description="Шаг повторения (каждые N дней/недель/месяцев)")
+    start_date: DateType = Field(..., description="Дата первого повторения")
+    end_date: Optional[DateType] = Field(None, description="Дата окончания серии (включительно)")
+    count: Optional[int] = Field(None, ge=1, description="Количество повторений")
+    start_time: TimeType = Field(..., description="Время начала каждого повторения")
+    end_time: TimeType = Field(..., description="Время окончания каждого повторения")
+
+
+class BookingSeriesCreate(BookingSeriesBase):
+    # Схема для создания серии
+    skip_conflicts: bool = Field(False, description="Пропускать занятые даты вместо отказа в создании серии")
+
+
+class BookingSeriesUpdate(BaseModel):
+    # Схема для изменения повторений серии
+    employee_id: Optional[int] = Field(None, gt=0)
+    start_time: Optional[TimeType] = None
+    end_time: Optional[TimeType] = None
+
+
+class BookingSeries(BookingSeriesBase):
+    # Схема серии для ответа API
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class BookingSeriesResult(BaseModel):
+    # Результат создания серии
+    series: BookingSeries
+    bookings: List[Booking] = Field(..., description="Созданные повторения")
+    skipped_dates: List[DateType] = Field(..., description="Даты, пропущенные из-за конфликтов")
+
+
+class BookingSeriesChange(BaseModel):
+    # Результат изменения повторений серии
+    series_id: int
+    affected: int = Field(..., ge=0, description="Количество измененных повторений")
+
+
 # Схема отчета
 class ResourceUsageReport(BaseModel):
     # Схема для отчета по использованию ресурсов
@@ -111,3 +215,57 @@ class ResourceUsageReport(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UsageReportRow(BaseModel):
+    # Строка отчета по загрузке: заполнены поля выбранных измерений
+    resource_id: Optional[int] = None
+    resource_name: Optional[str] = None
+    resource_type: Optional[str] = None
+    employee_id: Optional[int] = None
+    employee_name: Optional[str] = None
+    day: Optional[DateType] = None
+    week: Optional[DateType] = Field(None, description="Понедельник недели")
+    month: Optional[DateType] = Field(None, description="Первый день месяца")
+    total_hours: float = Field(..., ge=0, description="Забронированные часы")
+    booking_count: int = Field(..., ge=0, description="Количество бронирований")
+    utilisation: Optional[float] = Field(None, description="Загрузка рабочего времени ресурсов группы, %")
+
+
+# Схемы синхронизации
+class SyncDeleted(BaseModel):
+    # ID записей, удаленных после версии клиента
+    employees: List[int] = Field(default_factory=list)
+    resources: List[int] = Field(default_factory=list)
+    bookings: List[int] = Field(default_factory=list)
+
+
+class SyncChanges(BaseModel):
+    # Изменения после версии клиента
+    version: int = Field(..., ge=0, description="Версия, до которой включены изменения (since для следующего запроса)")
+    has_more: bool = Field(..., description="Есть изменения после version, не вошедшие в ответ")
+    employees: List[Employee] = Field(..., description="Созданные и измененные сотрудники")
+    resources: List[Resource] = Field(..., description="Созданные и измененные ресурсы")
+    bookings: List[Booking] = Field(..., description="Созданные и измененные бронирования")
+    deleted: SyncDeleted
+
+
+# Схемы тепловой карты загрузки
+class ResourceTypeHeatmap(BaseModel):
+    # Тепловая карта загрузки ресурсов одного типа
+    resource_type: str
+    resources: int = Field(..., description="Количество ресурсов типа")
+    utilisation: List[List[Optional[float]]] = Field(
+        ..., description="Загрузка в процентах: строки - дни недели с понедельника, столбцы - часы из hours"
+    )
+
+
+class HeatmapReport(BaseModel):
+    # Тепловая карта загрузки по типам ресурсов
+    date_from: DateType
+    date_to: DateType
+    day_start: TimeType
+    day_end: TimeType
+    hours: List[int] = Field(..., description="Часы рабочего дня, соответствующие столбцам карт")
+    heatmaps: List[ResourceTypeHeatmap]
+
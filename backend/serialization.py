@@ -0,0 +1,100 @@
+# Модуль быстрой сериализации ответов.
+# FastAPI проверяет объекты ORM по response_model, строит из них словари
+# и кодирует их стандартным json. Для данных, прочитанных из собственной БД,
+# проверка не нужна: быстрый путь (FAST_JSON=1) читает атрибуты объектов
+# по заранее построенному плану полей схемы и кодирует результат orjson.
+# Без orjson используется предкомпилированный TypeAdapter Pydantic.
+
+from inspect import isclass
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+import os
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Включение быстрого пути для ответов эндпоинтов
+FAST_JSON_ENABLED = os.getenv("FAST_JSON", "0") == "1"
+
+# План полей: (имя поля, план вложенной схемы или None для простого значения)
+FieldPlan = List[Tuple[str, Optional[list]]]
+
+
+# Вложенная схема поля (Model или Optional[Model]), иначе None
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    if get_origin(annotation) is Union:
+        models = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = models[0] if len(models) == 1 else None
+    if isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+# Построение плана полей схемы
+def build_field_plan(schema: Type[BaseModel]) -> FieldPlan:
+    plan = []
+    for name, field in schema.model_fields.items():
+        nested = _nested_model(field.annotation)
+        plan.append((name, build_field_plan(nested) if nested is not None else None))
+    return plan
+
+
+# Словарь из атрибутов объекта по плану полей
+def _to_dict(obj: Any, plan: FieldPlan) -> Dict[str, Any]:
+    result = {}
+    for name, nested in plan:
+        value = getattr(obj, name)
+        result[name] = _to_dict(value, nested) if nested is not None and value is not None else value
+    return result
+
+
+class JsonSerializer:
+    """
+    Сериализатор объекта или списка объектов ORM в JSON по схеме ответа.
+
+    Аргументы:
+        schema: Схема ответа
+        many: Сериализуется список объектов
+    """
+
+    def __init__(self, schema: Type[BaseModel], many: bool = False):
+        self.many = many
+        self.plan = build_field_plan(schema)
+        self.adapter = TypeAdapter(List[schema] if many else schema)
+
+    # Проверенный путь: TypeAdapter проверяет данные и кодирует их в Rust
+    def dump_json_validated(self, value: Any) -> bytes:
+        return self.adapter.dump_json(self.adapter.validate_python(value, from_attributes=True))
+
+    # Быстрый путь для доверенных объектов ORM: без проверки, кодирование orjson
+    def dump_json_trusted(self, value: Any) -> bytes:
+        if orjson is None:
+            return self.dump_json_validated(value)
+        if self.many:
+            return orjson.dumps([_to_dict(item, self.plan) for item in value])
+        return orjson.dumps(_to_dict(value, self.plan))
+
+    def dump_json(self, value: Any) -> bytes:
+        if FAST_JSON_ENABLED:
+            return self.dump_json_trusted(value)
+        return self.dump_json_validated(value)
+
+
+# Ответ эндпоинта: при включенном быстром пути - готовый JSON с заголовками
+# из response, иначе объекты ORM для обычной обработки по response_model
+def fast_json_response(serializer: JsonSerializer, value: Any, response: Optional[Response] = None):
+    if not FAST_JSON_ENABLED:
+        return value
+
+    headers = dict(response.headers) if response is not None else None
+    if headers is not None:
+        headers.pop("content-length", None)
+    return Response(
+        content=serializer.dump_json_trusted(value),
+        media_type="application/json",
+        headers=headers
+    )
@@ -0,0 +1,60 @@
+# Запуск сервера в производственном режиме: несколько воркеров uvicorn
+# на одном сокете. БД подготавливается один раз в главном процессе до запуска
+# воркеров; воркеры при старте только прогревают пулы и кэши (backend.lifecycle).
+# Остановка по SIGTERM/SIGINT плавная: воркеры перестают принимать соединения,
+# завершают ленты событий и дожидаются активных запросов (не дольше
+# GRACEFUL_SHUTDOWN_TIMEOUT секунд).
+#
+# Запуск: WEB_WORKERS=4 CACHE_BACKEND=redis python -m backend.server
+
+import os
+import sys
+
+import uvicorn
+
+from backend.cache_backend import CACHE_BACKEND
+from backend.database import engine
+from backend.lifecycle import DATABASE_PREPARED_ENV, prepare_database
+
+# Адрес и порт сервера
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Количество воркеров: по умолчанию по числу ядер при общем кэше в Redis,
+# иначе один (кэш в памяти у каждого воркера был бы свой)
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1) if CACHE_BACKEND == "redis" else "1"))
+# Ожидание активных запросов при остановке, секунды
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+# Время удержания простаивающих keep-alive соединений, секунды
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "5"))
+# Журнал запросов (access log) отключен по умолчанию: он заметно нагружает воркеры
+ACCESS_LOG = os.getenv("ACCESS_LOG", "0") == "1"
+
+
+def main() -> int:
+    # Кэш в памяти у каждого воркера свой: записи через один воркер
+    # не сбрасывали бы кэш и не доходили бы до лент событий остальных
+    if WEB_WORKERS > 1 and CACHE_BACKEND != "redis":
+        print("[ERROR] Для нескольких воркеров нужен общий кэш: CACHE_BACKEND=redis (или WEB_WORKERS=1)")
+        return 1
+
+    prepare_database()
+    # Соединения главного процесса воркерам не нужны
+    engine.dispose()
+    # Переменная окружения наследуется воркерами: повторная подготовка не нужна
+    os.environ[DATABASE_PREPARED_ENV] = "1"
+
+    uvicorn.run(
+        "backend.main:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_WORKERS,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        access_log=ACCESS_LOG,
+        proxy_headers=True
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
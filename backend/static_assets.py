@@ -0,0 +1,205 @@
+# Модуль раздачи статических файлов фронтенда.
+# При запуске каталог фронтенда читается в память один раз: для каждого файла
+# считаются хэш содержимого (ETag) и заранее сжатые варианты gzip и brotli.
+# Ссылки index.html на файлы фронтенда дополняются параметром ?v=<хэш>:
+# такие адреса неизменяемы и кэшируются браузером надолго, а сам index.html
+# и адреса без версии проверяются по ETag при каждом обращении (ответ 304).
+
+from typing import Dict, Iterable, Optional, Tuple
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from fastapi import Request, Response, status
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Каталог фронтенда
+FRONTEND_PATH = os.getenv("FRONTEND_PATH", "/app/frontend")
+
+# Срок кэширования адресов с версией, секунды
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+# Файлы меньше этого размера не сжимаются
+STATIC_COMPRESS_MIN_SIZE = 256
+
+INDEX_FILE = "index.html"
+VERSION_PARAM = "v"
+
+# Кодировки в порядке предпочтения
+ENCODINGS = ("br", "gzip")
+
+# Ссылки src/href на локальные файлы (без схемы, запроса и якоря)
+ASSET_REFERENCE = re.compile(r'\b(src|href)="(?![a-z]+:|/|#)([^"?#]+)"')
+
+
+class StaticAsset:
+    """
+    Файл фронтенда в памяти.
+
+    Аргументы:
+        path: Путь относительно каталога фронтенда
+        content: Содержимое файла
+
+    Атрибуты:
+        version: Хэш содержимого
+        media_type: Тип содержимого
+        bodies: Содержимое по кодировкам (identity - без сжатия)
+    """
+
+    __slots__ = ("path", "version", "media_type", "bodies")
+
+    def __init__(self, path: str, content: bytes):
+        self.path = path
+        self.version = hashlib.sha256(content).hexdigest()[:16]
+        self.media_type = media_type_of(path)
+        self.bodies: Dict[str, bytes] = {"identity": content}
+        if len(content) >= STATIC_COMPRESS_MIN_SIZE:
+            for encoding, body in compressed_variants(content):
+                # Вариант хранится, только если он меньше исходного файла
+                if len(body) < len(content):
+                    self.bodies[encoding] = body
+
+    # ETag варианта: у каждой кодировки свой, чтобы кэши не путали представления
+    def etag(self, encoding: str) -> str:
+        return f'"{self.version}"' if encoding == "identity" else f'"{self.version}-{encoding}"'
+
+
+# Тип содержимого с кодировкой для текстовых файлов
+def media_type_of(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type == "application/javascript":
+        media_type = "text/javascript"
+    if media_type.startswith("text/") or media_type in ("application/json", "image/svg+xml"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+# Сжатые варианты содержимого: (кодировка, тело)
+def compressed_variants(content: bytes) -> Iterable[Tuple[str, bytes]]:
+    if brotli is not None:
+        yield "br", brotli.compress(content, quality=11)
+    yield "gzip", gzip.compress(content, compresslevel=9, mtime=0)
+
+
+# Выбор кодировки по заголовку Accept-Encoding среди доступных
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> str:
+    """
+    Аргументы:
+        accept_encoding: Значение заголовка Accept-Encoding
+        available: Кодировки, в которых есть файл
+
+    Результаты:
+        Предпочтительная кодировка с q > 0 или identity
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip()] = weight
+
+    for encoding in ENCODINGS:
+        if encoding in available and weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+# Запрос условный и версия файла у клиента совпадает с текущей
+def not_modified(if_none_match: Optional[str], asset: StaticAsset) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # Слабое сравнение: префикс W/ и суффикс кодировки не учитываются
+        tag = tag.removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == asset.version:
+            return True
+    return False
+
+
+class StaticManifest:
+    """
+    Манифест файлов фронтенда, построенный при запуске.
+
+    Аргументы:
+        assets: Файлы по путям относительно каталога фронтенда
+    """
+
+    def __init__(self, assets: Dict[str, StaticAsset]):
+        self.assets = assets
+        self.index = assets.get(INDEX_FILE)
+
+    # Чтение каталога фронтенда (скрытые файлы пропускаются)
+    @classmethod
+    def load(cls, directory: str) -> "StaticManifest":
+        contents: Dict[str, bytes] = {}
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, directory).replace(os.sep, "/")
+                with open(full_path, "rb") as file:
+                    contents[path] = file.read()
+
+        assets = {path: StaticAsset(path, content) for path, content in contents.items() if not path.endswith(".html")}
+        # Страницы ссылаются на файлы по адресам с версией
+        for path, content in contents.items():
+            if path.endswith(".html"):
+                assets[path] = StaticAsset(path, versioned_references(path, content, assets))
+        return cls(assets)
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path.lstrip("/"))
+
+    def response(self, request: Request, asset: StaticAsset) -> Response:
+        """
+        Аргументы:
+            request: Запрос
+            asset: Файл фронтенда
+
+        Результаты:
+            Файл в подходящей кодировке или 304, если у клиента актуальная версия.
+            Адреса с текущей версией кэшируются надолго, остальные проверяются по ETag.
+        """
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), asset.bodies)
+        versioned = asset is not self.index and request.query_params.get(VERSION_PARAM) == asset.version
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": f"public, max-age={STATIC_MAX_AGE}, immutable" if versioned else "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if not_modified(request.headers.get("if-none-match"), asset):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+
+# Замена ссылок страницы на файлы фронтенда абсолютными адресами с версией
+def versioned_references(page: str, content: bytes, assets: Dict[str, StaticAsset]) -> bytes:
+    base = os.path.dirname(page)
+
+    def replace(match: re.Match) -> str:
+        path = os.path.normpath(os.path.join(base, match.group(2))).replace(os.sep, "/")
+        asset = assets.get(path)
+        if asset is None:
+            return match.group(0)
+        return f'{match.group(1)}="/{path}?{VERSION_PARAM}={asset.version}"'
+
+    return ASSET_REFERENCE.sub(replace, content.decode("utf-8")).encode("utf-8")
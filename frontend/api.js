@@ -113,6 +113,16 @@ const resourcesAPI = {
 
 const bookingsAPI = {
     getAll: () => fetchAPI('/bookings/'),
+    search: (params = {}) => {
+        // Пустые значения фильтров не передаем
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                query.append(key, value);
+            }
+        });
+        return fetchAPI(`/bookings/search?${query.toString()}`);
+    },
     getById: (id) => fetchAPI(`/bookings/${id}`),
     getToday: () => fetchAPI('/bookings/today'),
     getByResource: (resourceId) => fetchAPI(`/bookings/by_resource/${resourceId}`),
@@ -128,6 +138,20 @@ const bookingsAPI = {
     delete: (id) => fetchAPI(`/bookings/${id}`, {
         method: 'DELETE',
     }),
+    // Подписка на ленту изменений (Server-Sent Events)
+    subscribe: (params = {}, onEvent) => {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                query.append(key, value);
+            }
+        });
+        const source = new EventSource(`${API_BASE_URL}/bookings/stream?${query.toString()}`);
+        ['created', 'updated', 'deleted', 'reset'].forEach(type => {
+            source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)));
+        });
+        return source;
+    },
 };
 
 // ==================== Reports API ====================
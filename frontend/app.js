@@ -6,6 +6,9 @@ let currentEmployees = [];
 let currentResources = [];
 let currentBookings = [];
 let filteredBookings = [];
+let bookingsStream = null;
+let bookingsStreamKey = null;
+let bookingsReloadTimer = null;
 
 // ==================== Инициализация ====================
 
@@ -92,38 +95,42 @@ async function loadAllBookings() {
 
 async function loadFilteredBookings() {
     try {
-        await loadAllBookings(); // Сначала загружаем все бронирования
-        
         const dateFilter = document.getElementById('dateFilter').value;
         const resourceFilter = document.getElementById('resourceFilter').value;
         const employeeFilter = document.getElementById('employeeFilter').value;
-        
-        // Применяем фильтры
-        filteredBookings = currentBookings.filter(booking => {
-            // Фильтр по дате
-            if (dateFilter && booking.date !== dateFilter) {
-                return false;
-            }
-            
-            // Фильтр по ресурсу
-            if (resourceFilter && booking.resource_id !== parseInt(resourceFilter)) {
-                return false;
-            }
-            
-            // Фильтр по сотруднику
-            if (employeeFilter && booking.employee_id !== parseInt(employeeFilter)) {
-                return false;
-            }
-            
-            return true;
+
+        // Фильтрация выполняется на сервере
+        filteredBookings = await api.bookings.search({
+            date_from: dateFilter,
+            date_to: dateFilter,
+            resource_id: resourceFilter,
+            employee_id: employeeFilter,
         });
-        
+
         renderBookingsTable(filteredBookings);
+        subscribeToBookings(dateFilter, resourceFilter);
     } catch (error) {
         showError('Ошибка загрузки бронирований: ' + error.message);
     }
 }
 
+// Подписка на изменения бронирований по текущим фильтрам вместо опроса:
+// при событии список перечитывается (несколько событий подряд - один раз)
+function subscribeToBookings(dateFilter, resourceFilter) {
+    const key = `${dateFilter}|${resourceFilter}`;
+    if (bookingsStream && bookingsStreamKey === key) {
+        return;
+    }
+    if (bookingsStream) {
+        bookingsStream.close();
+    }
+    bookingsStreamKey = key;
+    bookingsStream = api.bookings.subscribe({ date: dateFilter, resource_id: resourceFilter }, () => {
+        clearTimeout(bookingsReloadTimer);
+        bookingsReloadTimer = setTimeout(loadFilteredBookings, 300);
+    });
+}
+
 async function filterByDate() {
     await loadFilteredBookings();
 }